@@ -3,28 +3,43 @@ import os
 import time
 from dotenv import load_dotenv
 
-from components.core_logic import get_ai_response, GHADEER_PROFILE
-from components.voice_handler import play_audio_button
+from components.core_logic import stream_ai_response, prewarm_in_background, GHADEER_PROFILE
+from components.voice_handler import play_audio_button, presynthesize_audio, record_and_recognize
 from components.lang_handler import detect_language
-from components.image_processor import perform_ocr 
+from components.response_cache import RESPONSE_CACHE_ENABLED, get_response_cache
+from components.metrics import REGISTRY as METRICS, start_metrics_server
+# components.image_processor (pytesseract, OpenCV) sirf OCR button par import hota hai
 
 load_dotenv()
 
 # --- INITIAL SETUP & CONSTANTS ---
 AI_NAME = "Rafiq (رفيق)"
 USER_NAME = GHADEER_PROFILE.get("name", "Ghadeer")
+USER_ID = "ghadeer"  # rafiq_memory.db key (rolling summary etc.)
 LOGO_PATH = "assets/rafiq_logo.png"
-TEMP_IMAGE_KEY = "temp_uploaded_image.png"
+HISTORY_WINDOW = 30  # itne recent messages render hote hain, baaki "load older" ke peeche
 
 st.set_page_config(page_title=f"{AI_NAME} - Personal Companion", layout="wide")
 
+
+@st.cache_resource
+def start_prewarm():
+    # Process mein ek hi baar: LLM client + langid model background mein load
+    return prewarm_in_background()
+
+
+start_prewarm()
+start_metrics_server()  # sirf RAFIQ_METRICS_PORT set ho toh; process mein ek baar
+
 # Initialize Session State
 if "messages" not in st.session_state:
     st.session_state["messages"] = [
-        {"role": "assistant", "content": f"👋 مرحبًا يا **{USER_NAME}**! أنا رفيقك الشخصي، كيف يمكنني مساعدتك اليوم؟"}
+        {"role": "assistant", "content": f"👋 مرحبًا يا **{USER_NAME}**! أنا رفيقك الشخصي، كيف يمكنني مساعدتك اليوم؟", "lang": "ar"}
     ]
 if "image_uploaded" not in st.session_state:
     st.session_state["image_uploaded"] = False
+if "history_window" not in st.session_state:
+    st.session_state["history_window"] = HISTORY_WINDOW
 if "model" not in st.session_state:
     st.session_state["model"] = "openai/gpt-4o-mini"  # Default model
 
@@ -66,31 +81,32 @@ with st.sidebar:
     st.subheader("📸 Text Extraction (OCR)")
     uploaded_file = st.file_uploader("Upload Image with Text", type=["png", "jpg", "jpeg"], key="image_uploader")
 
-    if uploaded_file is not None and 'current_image_path' not in st.session_state:
-        temp_path = os.path.join("assets", TEMP_IMAGE_KEY)
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
+    if uploaded_file is not None and 'current_image_bytes' not in st.session_state:
+        # Upload memory mein hi rehta hai - shared temp file nahi (do sessions ek saath upload kar sakte hain)
         st.session_state['image_uploaded'] = True
-        st.session_state['current_image_path'] = temp_path
+        st.session_state['current_image_bytes'] = uploaded_file.getvalue()
         st.rerun()
 
     # --- OCR Analysis Panel ---
-    if st.session_state['image_uploaded'] and 'current_image_path' in st.session_state:
+    if st.session_state['image_uploaded'] and 'current_image_bytes' in st.session_state:
         st.markdown("---")
         st.caption("Uploaded Image Preview:")
-        st.image(st.session_state['current_image_path'], use_container_width=True)
+        st.image(st.session_state['current_image_bytes'], use_container_width=True)
         st.info("Mode: Text Extraction (OCR)")
 
         if st.button("Extract Text (OCR)", key="extract_btn"):
             with st.spinner("Extracting text..."):
-                extracted_text = perform_ocr(st.session_state['current_image_path'])
+                from components.image_processor import perform_ocr
+                extracted_text = perform_ocr(st.session_state['current_image_bytes'])
                 response_content = f"**🔍 Extracted Text (OCR) Result:**\n\n```\n{extracted_text}\n```\n\n"
                 
-                st.session_state.messages.append({"role": "assistant", "content": response_content})
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": response_content,
+                    "lang": detect_language(extracted_text or "")[0],
+                })
                 
-                os.remove(st.session_state['current_image_path'])
-                del st.session_state['current_image_path']
+                del st.session_state['current_image_bytes']
                 st.session_state['image_uploaded'] = False
                 st.rerun()
 
@@ -99,12 +115,62 @@ with st.sidebar:
     # Clear chat button
     if st.button("🔄 Clear Chat Memory"):
         st.session_state["messages"] = [
-            {"role": "assistant", "content": f"👋 مرحبًا يا **{USER_NAME}**! أنا رفيقك الشخصي، كيف يمكنني مساعدتك اليوم؟"}
+            {"role": "assistant", "content": f"👋 مرحبًا يا **{USER_NAME}**! أنا رفيقك الشخصي، كيف يمكنني مساعدتك اليوم؟", "lang": "ar"}
         ]
+        st.session_state["history_window"] = HISTORY_WINDOW
         st.rerun()
 
+    st.markdown("---")
+
+    # --- Voice Input (offline STT) ---
+    # st.audio_input clip recording rukne ke baad hi deta hai: transcription stop dabane par shuru hoti hai,
+    # bolte waqt nahi. Partial transcript clip ke andar ki utterances ke hisaab se dikhta hai.
+    st.subheader("🎙️ Voice Input")
+    voice_clip = st.audio_input("Record a message", key="voice_input")
+    if voice_clip is not None and voice_clip.file_id != st.session_state.get("voice_clip_id"):
+        # Har recording sirf ek baar transcribe hoti hai (reruns par dobara nahi)
+        st.session_state["voice_clip_id"] = voice_clip.file_id
+        live_transcript = st.empty()
+        voice_text, voice_segments = record_and_recognize(voice_clip, placeholder=live_transcript)
+        live_transcript.empty()
+        st.session_state["voice_prompt"] = voice_text or None
+        st.session_state["last_stt_segments"] = voice_segments
+    stt_segments = st.session_state.get("last_stt_segments")
+    if stt_segments:
+        rtfs = [s["rtf"] for s in stt_segments if s["rtf"] is not None]
+        if rtfs:
+            st.caption(f"🗣️ {len(stt_segments)} segment(s), max RTF {max(rtfs):.2f}")
+
     st.markdown("---")
     st.caption("🎧 Use 'Play' button for voice response.")
+    st.checkbox("⚡ Prepare voice for new replies", key="presynth_audio",
+                help="Synthesize each new reply in the background so 'Play' starts instantly.")
+
+    # Latency of the last streamed reply
+    last_stats = st.session_state.get("last_stream_stats")
+    if last_stats and last_stats.get("total") is not None:
+        ttft = last_stats.get("ttft")
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+        st.caption(f"⏱️ First token: {ttft_text} · Total: {last_stats['total']:.2f}s ({last_stats['model']})")
+        usage = last_stats.get("usage") or {}
+        if usage.get("prompt_tokens"):
+            # Provider prompt cache: stable prefix jitna lamba, utne zyada tokens yahan cached
+            st.caption(f"🧠 Prompt cache: {usage.get('cached_tokens', 0)}/{usage['prompt_tokens']} tokens")
+    # Per-stage latency (is process ke liye)
+    if st.checkbox("📊 Show latency panel", key="show_latency_panel"):
+        stage_rows = METRICS.summary()
+        if stage_rows:
+            st.dataframe(
+                [{"stage": r["stage"], "n": r["count"], "p50 ms": round(r["p50_ms"], 1),
+                  "p95 ms": round(r["p95_ms"], 1)} for r in stage_rows],
+                hide_index=True, use_container_width=True,
+            )
+        else:
+            st.caption("No timings recorded yet.")
+    if RESPONSE_CACHE_ENABLED:
+        cache_stats = get_response_cache().stats()
+        st.caption(f"🗄️ Reply cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                   f"({cache_stats['hit_rate']:.0%}), saved {cache_stats['latency_saved_s']:.1f}s")
 
 
 # --- MAIN INTERFACE ---
@@ -114,23 +180,50 @@ st.markdown("---")
 
 
 # Display Chat History
-for i, message in enumerate(st.session_state.messages):
-    with st.chat_message(message["role"]):
-        st.write(message["content"])
-        if message["role"] == "assistant":
-            lang_code, _ = detect_language(message["content"])
-            play_audio_button(message["content"], language=lang_code, unique_key=i)
+# Sirf aakhri HISTORY_WINDOW messages render hote hain; fragment ki wajah se "load older"
+# aur play buttons poora page rerun nahi karte.
+def load_older_messages():
+    st.session_state["history_window"] += HISTORY_WINDOW
+
+
+@st.fragment
+def render_chat_history():
+    messages = st.session_state.messages
+    start = max(0, len(messages) - st.session_state["history_window"])
+    if start > 0:
+        st.button(f"⬆️ Load older messages ({start} hidden)", key="load_older", on_click=load_older_messages)
+
+    for i in range(start, len(messages)):
+        message = messages[i]
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+            if message["role"] == "assistant":
+                lang_code = message.get("lang") or detect_language(message["content"])[0]
+                play_audio_button(message["content"], language=lang_code, unique_key=i)
+
+
+render_chat_history()
 
 
 # --- Chat Input & AI Response ---
-if prompt := st.chat_input(f"Speak to {AI_NAME} (رفيق) in any language..."):
-    st.session_state.messages.append({"role": "user", "content": prompt})
+voice_prompt = st.session_state.pop("voice_prompt", None)  # sidebar mic se aaya hua transcript
+if prompt := st.chat_input(f"Speak to {AI_NAME} (رفيق) in any language...") or voice_prompt:
+    st.session_state.messages.append({"role": "user", "content": prompt, "lang": detect_language(prompt)[0]})
     with st.chat_message("user"):
         st.write(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner(f"{AI_NAME} is thinking..."):
-            ai_response = get_ai_response(st.session_state.messages, model=st.session_state["model"])
-            st.write(ai_response)
-            st.session_state.messages.append({"role": "assistant", "content": ai_response})
-            st.rerun()
+        # Tokens render as they arrive instead of behind a spinner
+        stream_stats = {}
+        ai_response = st.write_stream(
+            stream_ai_response(st.session_state.messages, model=st.session_state["model"],
+                               stats=stream_stats, user_id=USER_ID)
+        )
+        ai_response = (ai_response or "").strip()
+        reply_lang = detect_language(ai_response)[0]
+        st.session_state.messages.append({"role": "assistant", "content": ai_response, "lang": reply_lang})
+        if st.session_state.get("presynth_audio") and ai_response:
+            presynthesize_audio(ai_response, language=reply_lang)
+        st.session_state["last_stream_stats"] = stream_stats
+        # Full st.rerun() nahi: naye bubbles already screen par hain, sirf play button chahiye
+        play_audio_button(ai_response, language=reply_lang, unique_key=len(st.session_state.messages) - 1)
@@ -0,0 +1,165 @@
+"""
+Load test for the headless API server (components/api_server.py) against the local stub LLM server.
+
+    python benchmarks/bench_api.py [--users 50] [--requests 4] [--llm-concurrency 16] [--latency 0.3]
+
+Har virtual user apna user_id use karta hai (alag session), requests ek ke baad ek bhejta hai.
+Reports requests/s, p50/p95/p99 latency, streaming time-to-first-byte aur 429 count.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+from stub_llm_server import StubConfig, start_stub_server
+
+from components import llm_gateway, memory_handler
+from components.api_server import RafiqService, create_app
+
+PROMPTS = ["كيف حالك اليوم؟", "How do I make a good latte?", "أشعر بالتعب بعد العمل", "Give me a short dua"]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api_server(service):
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(service), host="127.0.0.1", port=port,
+                                           log_level="warning", backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    return server, thread, port
+
+
+def chat_request(port, user_id, message, stream):
+    """Returns (status, total_s, ttfb_s). ttfb = pehla SSE delta (streaming) ya poora body."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    body = json.dumps({"user_id": user_id, "message": message, "stream": stream})
+    start = time.perf_counter()
+    try:
+        conn.request("POST", "/v1/chat", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        ttfb = None
+        status = response.status
+        if stream and status == 200:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                if line.startswith(b"data:"):
+                    event = json.loads(line[5:])
+                    if ttfb is None and "delta" in event:
+                        ttfb = time.perf_counter() - start
+                    if event.get("status") == 429:
+                        status = 429
+        else:
+            response.read()
+        total = time.perf_counter() - start
+        return status, total, ttfb if ttfb is not None else total
+    finally:
+        conn.close()
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def load(port, users, requests_per_user, stream):
+    results = []
+    lock = threading.Lock()
+
+    def user(index):
+        for i in range(requests_per_user):
+            outcome = chat_request(port, f"load-user-{index}", PROMPTS[(index + i) % len(PROMPTS)], stream)
+            with lock:
+                results.append(outcome)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    wall = time.perf_counter() - start
+
+    ok = [r for r in results if r[0] == 200]
+    latencies = [r[1] for r in ok]
+    ttfbs = [r[2] for r in ok]
+    return {
+        "mode": "stream" if stream else "blocking",
+        "users": users,
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected_429": sum(1 for r in results if r[0] == 429),
+        "errors": sum(1 for r in results if r[0] not in (200, 429)),
+        "requests_per_s": len(ok) / wall,
+        "p50_ms": (_percentile(latencies, 0.50) or 0) * 1000,
+        "p95_ms": (_percentile(latencies, 0.95) or 0) * 1000,
+        "p99_ms": (_percentile(latencies, 0.99) or 0) * 1000,
+        "ttfb_p95_ms": (_percentile(ttfbs, 0.95) or 0) * 1000,
+    }
+
+
+def run(users=50, requests=4, llm_concurrency=16, llm_queue=64, latency=0.3, ttft=0.1, overload=True):
+    stub, base_url = start_stub_server(StubConfig(latency=latency, ttft=ttft, token_delay=0.005))
+    previous_gateway, previous_db = llm_gateway._gateway, memory_handler.DB_PATH
+    llm_gateway._gateway = llm_gateway.LLMGateway("stub", base_url=base_url)
+    # (label, service, streaming, requests per user)
+    plans = [("blocking", RafiqService(llm_concurrency, llm_queue, ocr_workers=1), [(False, requests), (True, requests)])]
+    if overload:
+        # Chhota pool + chhoti queue: extra load ko jaldi 429 milna chahiye, timeout nahi
+        plans.append(("overload", RafiqService(llm_concurrency=2, llm_queue=2, ocr_workers=1), [(False, 1)]))
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            memory_handler.DB_PATH = os.path.join(workdir, "bench_api.db")
+            for label, service, loads in plans:
+                server, thread, port = start_api_server(service)
+                try:
+                    for stream, per_user in loads:
+                        row = load(port, users, per_user, stream)
+                        if label == "overload":
+                            row["mode"] = label
+                        results.append(row)
+                finally:
+                    server.should_exit = True
+                    thread.join(timeout=10)
+            memory_handler.close_connection()
+    finally:
+        llm_gateway._gateway, memory_handler.DB_PATH = previous_gateway, previous_db
+        stub.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=4, help="requests per user")
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    parser.add_argument("--llm-queue", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM latency (s)")
+    args = parser.parse_args()
+
+    rows = run(args.users, args.requests, args.llm_concurrency, args.llm_queue, args.latency)
+    print(f"{'mode':<9} {'ok':>5} {'429':>5} {'err':>4} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'ttfb p95':>9}")
+    for r in rows:
+        print(f"{r['mode']:<9} {r['ok']:>5} {r['rejected_429']:>5} {r['errors']:>4} {r['requests_per_s']:>7.1f} "
+              f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f} {r['ttfb_p95_ms']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+End-to-end get_ai_response / stream_ai_response latency against the local stub LLM server.
+
+    python benchmarks/bench_chat.py [--requests 50] [--latency 0.2] [--ttft 0.05]
+
+"hedge_off" / "hedge_on": gateway.chat par STRAGGLER_RATE requests STRAGGLER_DELAY der se pehla token
+dete hain; hedge=True waali call HEDGE_MIN_DELAY ke baad doosri request bhejti hai (hedges = kitni baar).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_llm_server import DEFAULT_REPLY, StubConfig, start_stub_server
+
+from components import core_logic, llm_gateway, memory_handler
+
+STRAGGLER_RATE = 0.1
+STRAGGLER_DELAY = 1.0
+HEDGE_MIN_DELAY = 0.2         # bench mein chhota; default 1.0 real network ke liye
+
+PROMPTS = [
+    "كيف حالك اليوم؟",
+    "How do I make a good latte?",
+    "أشعر بالوحدة في ماليزيا",
+    "Can you give me a dua for patience?",
+]
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_hedged(requests, ttft, token_delay):
+    """Same straggling stub par hedge off/on. Returns rows."""
+    # Non-streaming jawab utna hi le jitna poora stream, taaki hedge off (blocking) aur on (streams) barabar hon
+    full_reply = ttft + token_delay * len(DEFAULT_REPLY.split(" "))
+    server, base_url = start_stub_server(StubConfig(latency=full_reply, ttft=ttft, token_delay=token_delay,
+                                                    straggler_rate=STRAGGLER_RATE, straggler_delay=STRAGGLER_DELAY))
+    previous_delay = llm_gateway.HEDGE_MIN_DELAY
+    llm_gateway.HEDGE_MIN_DELAY = HEDGE_MIN_DELAY
+    rows = []
+    try:
+        for hedge in (False, True):
+            random.seed(3)   # dono modes mein same stragglers
+            gateway = llm_gateway.LLMGateway("stub", base_url=base_url)
+            latencies = []
+            for i in range(requests):
+                start = time.perf_counter()
+                gateway.chat(messages=[{"role": "user", "content": PROMPTS[i % len(PROMPTS)]}],
+                             model=llm_gateway.DEFAULT_MODEL, fallback=False, hedge=hedge)
+                latencies.append(time.perf_counter() - start)
+            rows.append({"mode": "hedge_on" if hedge else "hedge_off", "requests": requests,
+                         "p50_ms": statistics.median(latencies) * 1000,
+                         "p95_ms": _percentile(latencies, 0.95) * 1000,
+                         "max_ms": max(latencies) * 1000, "hedges": gateway.hedges})
+    finally:
+        llm_gateway.HEDGE_MIN_DELAY = previous_delay
+        server.shutdown()
+    return rows
+
+
+def run(requests=50, latency=0.2, ttft=0.05, token_delay=0.005):
+    server, base_url = start_stub_server(StubConfig(latency=latency, ttft=ttft, token_delay=token_delay))
+    previous_gateway = llm_gateway._gateway
+    previous_db = memory_handler.DB_PATH
+    llm_gateway._gateway = llm_gateway.LLMGateway("stub", base_url=base_url)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            memory_handler.DB_PATH = os.path.join(workdir, "bench.db")
+            history = [{"role": "assistant", "content": "👋 مرحبًا!", "lang": "ar"}]
+
+            blocking = []
+            for i in range(requests):
+                history.append({"role": "user", "content": PROMPTS[i % len(PROMPTS)]})
+                start = time.perf_counter()
+                reply = core_logic.get_ai_response(history, user_id="bench", use_cache=False)
+                blocking.append(time.perf_counter() - start)
+                history.append({"role": "assistant", "content": reply})
+
+            ttfts, totals = [], []
+            for i in range(requests):
+                history.append({"role": "user", "content": PROMPTS[i % len(PROMPTS)]})
+                stats = {}
+                reply = "".join(core_logic.stream_ai_response(history, stats=stats, user_id="bench", use_cache=False))
+                ttfts.append(stats["ttft"])
+                totals.append(stats["total"])
+                history.append({"role": "assistant", "content": reply})
+            memory_handler.close_connection()
+    finally:
+        llm_gateway._gateway = previous_gateway
+        memory_handler.DB_PATH = previous_db
+        server.shutdown()
+
+    return [
+        {"mode": "blocking", "requests": requests, "p50_ms": statistics.median(blocking) * 1000,
+         "p95_ms": _percentile(blocking, 0.95) * 1000},
+        {"mode": "stream_ttft", "requests": requests, "p50_ms": statistics.median(ttfts) * 1000,
+         "p95_ms": _percentile(ttfts, 0.95) * 1000},
+        {"mode": "stream_total", "requests": requests, "p50_ms": statistics.median(totals) * 1000,
+         "p95_ms": _percentile(totals, 0.95) * 1000},
+    ] + run_hedged(requests, ttft, token_delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'mode':<14} {'p50 (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10} {'hedges':>7}")
+    for r in run(args.requests, args.latency, args.ttft):
+        extra = f" {r['max_ms']:>10.1f} {r['hedges']:>7}" if "hedges" in r else ""
+        print(f"{r['mode']:<14} {r['p50_ms']:>10.1f} {r['p95_ms']:>10.1f}{extra}")
+
+
+if __name__ == '__main__':
+    main()
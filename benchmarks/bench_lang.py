@@ -0,0 +1,59 @@
+"""
+detect_language throughput: script fast path vs langid, cold vs memoized.
+
+    python benchmarks/bench_lang.py [--messages 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from components import lang_handler
+
+SAMPLES = [
+    "كيف حالك اليوم يا صديقي؟",
+    "How are you doing today?",
+    "नमस्ते, आप कैसे हैं?",
+    "Hola, ¿cómo estás hoy?",
+    "Bonjour, je suis fatiguée aujourd'hui.",
+    "Bugün nasılsın?",
+    "أريد وصفة وافل سهلة please",
+]
+
+
+def run(messages=2000):
+    rng = random.Random(3)
+    texts = [f"{rng.choice(SAMPLES)} {i}" for i in range(messages)]
+    lang_handler.warm_up_language_model()   # model load ko throughput mein nahi ginte
+
+    results = []
+    for mode in ("langid_only", "script_fast_path", "memoized"):
+        if mode != "memoized":
+            lang_handler._detect_cache.clear()
+        start = time.perf_counter()
+        if mode == "langid_only":
+            langid = lang_handler._get_langid()
+            for text in texts:
+                langid.classify(text)
+        else:
+            lang_handler.detect_languages(texts)
+        elapsed = time.perf_counter() - start
+        results.append({"mode": mode, "messages": messages, "total_s": elapsed, "messages_per_s": messages / elapsed})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'mode':<18} {'total (s)':>10} {'msgs/s':>12}")
+    for r in run(args.messages):
+        print(f"{r['mode']:<18} {r['total_s']:>10.3f} {r['messages_per_s']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Per-turn save latency: legacy JSON-blob save vs append_messages (sirf naya message) vs save_memory
+(poori list do, DB khud diff kare - app yahi karta hai).
+
+    python benchmarks/bench_memory.py [--sizes 10 1000 100000] [--turns 20]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from components import memory_handler
+
+
+def make_history(n):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant",
+         "content": f"رسالة رقم {i} - message number {i} " * 4,
+         "lang": "ar"}
+        for i in range(n)
+    ]
+
+
+def legacy_save(db_path, user_id, messages):
+    # Purana save_memory: har turn naya connection + poori history ka JSON rewrite
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('CREATE TABLE IF NOT EXISTS user_chats (user_id TEXT PRIMARY KEY, chat_history TEXT)')
+        conn.execute('INSERT OR REPLACE INTO user_chats (user_id, chat_history) VALUES (?, ?)',
+                     (user_id, json.dumps(messages)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _timed(fn, turns):
+    times = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def bench_size(size, turns, workdir):
+    history = make_history(size)
+    new_turn = {"role": "user", "content": "كيف حالك اليوم؟", "lang": "ar"}
+
+    legacy_db = os.path.join(workdir, f"legacy_{size}.db")
+    legacy_save(legacy_db, "bench", history)
+
+    def legacy_turn():
+        history.append(new_turn)
+        legacy_save(legacy_db, "bench", history)
+
+    legacy_ms = _timed(legacy_turn, turns)
+    del history[size:]
+
+    memory_handler.DB_PATH = os.path.join(workdir, f"rows_{size}.db")
+    memory_handler.append_messages("bench", history)
+    append_ms = _timed(lambda: memory_handler.append_messages("bench", [new_turn]), turns)
+    history.extend([new_turn] * turns)
+
+    def save_turn():
+        history.append(new_turn)
+        memory_handler.save_memory("bench", history)
+
+    save_ms = _timed(save_turn, turns)
+    tail_ms = _timed(lambda: memory_handler.load_tail("bench", 50), turns)
+    start = time.perf_counter()
+    memory_handler.load_memory("bench")
+    full_load = time.perf_counter() - start
+    memory_handler.close_connection()
+
+    return [
+        {"messages": size, "mode": "legacy_blob", "save_ms": legacy_ms},
+        {"messages": size, "mode": "append_messages", "save_ms": append_ms, "speedup": legacy_ms / append_ms},
+        {"messages": size, "mode": "save_memory", "save_ms": save_ms, "speedup": legacy_ms / save_ms},
+        {"messages": size, "mode": "load", "load_tail50_ms": tail_ms, "load_full_ms": full_load * 1000},
+    ]
+
+
+def run(sizes=(10, 1000, 100000), turns=20):
+    with tempfile.TemporaryDirectory() as workdir:
+        return [row for size in sizes for row in bench_size(size, turns, workdir)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'mode':<16} {'ms':>10} {'speedup':>8}")
+    for r in run(args.sizes, args.turns):
+        if r["mode"] == "load":
+            print(f"{r['messages']:>10} {'load tail-50':<16} {r['load_tail50_ms']:>10.3f}")
+            print(f"{r['messages']:>10} {'load full':<16} {r['load_full_ms']:>10.3f}")
+        else:
+            speedup = f"{r['speedup']:>7.1f}x" if "speedup" in r else ""
+            print(f"{r['messages']:>10} {r['mode']:<16} {r['save_ms']:>10.3f} {speedup:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+OCR throughput: full-resolution pytesseract (old perform_ocr) vs the in-memory OpenCV pipeline.
+
+    python benchmarks/bench_ocr.py [images ...] [--repeat 3]
+
+Needs the Tesseract binary (with the 'ara' and 'eng' traineddata) on PATH.
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytesseract
+from PIL import Image
+
+from components.ocr_pipeline import OCR_LANG, ocr_image_bytes
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def baseline_ocr(data):
+    return pytesseract.image_to_string(Image.open(io.BytesIO(data)), lang=OCR_LANG).strip()
+
+
+def timed(fn, payloads, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in payloads:
+            fn(data)
+    elapsed = time.perf_counter() - start
+    return elapsed, repeat * len(payloads) / elapsed
+
+
+def make_fixture_images():
+    """Offline fixtures: ek wide phone screenshot (4000px) aur ek tall chat screenshot, text ke saath."""
+    from PIL import ImageDraw, ImageFont
+
+    lines = [
+        "Order #1042 - Iced Spanish Latte, oat milk",
+        "Shift starts 7:00 AM, Cameron Highlands branch",
+        "Waffle batter: 2 eggs, 250g flour, 400ml milk",
+        "Customer feedback: excellent service, very clean",
+    ]
+    fixtures = []
+    for width, height, font_size in ((4000, 2200, 96), (1080, 6000, 40)):
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=font_size)
+        y = font_size
+        while y < height - 2 * font_size:
+            draw.text((font_size, y), lines[(y // font_size) % len(lines)], fill="black", font=font)
+            y += int(font_size * 1.8)
+        out = io.BytesIO()
+        image.save(out, format="PNG")
+        fixtures.append(out.getvalue())
+    return fixtures
+
+
+def run(payloads=None, repeat=3):
+    payloads = payloads or make_fixture_images()
+    modes = [
+        ("baseline", lambda d: baseline_ocr(d)),
+        ("pipeline_cold", lambda d: ocr_image_bytes(d, use_cache=False)),
+        ("pipeline_cached", lambda d: ocr_image_bytes(d)),
+    ]
+    results = []
+    for name, fn in modes:
+        elapsed, throughput = timed(fn, payloads, repeat)
+        results.append({"mode": name, "images": len(payloads), "total_s": elapsed, "images_per_s": throughput})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*", help="defaults to generated fixtures + assets/*.png")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = args.images or sorted(glob.glob(os.path.join(ROOT, 'assets', '*.png')))
+    payloads = [] if args.images else make_fixture_images()
+    for path in paths:
+        with open(path, 'rb') as f:
+            payloads.append(f.read())
+    print(f"{len(payloads)} images, {args.repeat} passes")
+
+    print(f"{'mode':<26} {'total (s)':>10} {'images/s':>10}")
+    for r in run(payloads, args.repeat):
+        print(f"{r['mode']:<26} {r['total_s']:>10.2f} {r['images_per_s']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Provider prompt-cache hit rate, TTFT and input cost: old prompt layout vs prefix-stable assembly.
+
+    python benchmarks/bench_prompt_cache.py [--turns 40] [--prefill-per-token 0.0002]
+
+Stub server OpenAI jaisa prefix caching simulate karta hai (>=1024 tokens, 128-token blocks, app ke hi
+token counter se) aur har uncached prompt token par prefill time lagata hai. TTFT prompt build se ginta
+hai (blocking summarizer call bhi); input cost mein summarizer ke prompt tokens bhi shaamil. Baseline "legacy" hai = original layout (language name
+system prompt ki pehli line mein, aakhri 10 messages); har mode ka cost/TTFT isi ke against report hota hai.
+"sliding" = sirf ablation: wahi system prompt ke saath token-budget newest-first window (har turn shuru ka
+message girta hai, koi prefix reuse nahi); "stable" = build_messages_for_api.
+Summarizer (blocking LLM call) lagaatar do turns par chale toh scenario error deta hai.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_llm_server import StubConfig, start_stub_server
+
+from components import core_logic, llm_gateway, memory_handler
+from components.metrics import REGISTRY
+from components.context_builder import MESSAGE_OVERHEAD_TOKENS, count_tokens, get_token_budget, message_tokens
+from components.batch_runner import MODEL_PRICES
+
+MODEL = "openai/gpt-4o-mini"
+CACHED_PRICE_FACTOR = 0.5     # OpenAI cached input tokens aadhi keemat par
+
+USER_TURNS = [
+    ("ar", "اليوم كان العمل في المقهى طويلاً جداً، حضّرت أكثر من مئة كوب قهوة وأشعر بالتعب الشديد في قدمي وظهري."),
+    ("en", "Can you help me write a short message to my manager asking to switch my Friday shift to the morning?"),
+    ("ar", "أشتاق إلى أهلي في سوريا كثيراً، خاصة في المساء عندما أكون وحدي في الغرفة بعد انتهاء الدوام."),
+    ("en", "What is a simple recipe for a chocolate waffle topping that I can prepare quickly between orders?"),
+    ("ar", "هل يمكنك أن تذكّرني بدعاء جميل للصبر والطمأنينة قبل النوم؟ أريد أن أحفظه وأردده كل ليلة."),
+]
+ASSISTANT_REPLY = ("أفهم شعورك تماماً، وأنا هنا معك دائماً. خذي نفساً عميقاً، واشربي كوب ماء، "
+                   "وتذكّري أن كل يوم متعب يقرّبك خطوة من أحلامك. هل تريدين أن نخطط معاً لراحة صغيرة غداً؟ ") * 2
+
+
+def legacy_system_prompt(lang):
+    return (
+        "You are **Rafiq (رفيق)** — a friendly and emotionally intelligent AI assistant created by Mohammad "
+        "for Ghadeer Mahmoud. You must always reply **in the same language** as the user's message "
+        f"(detected: {core_logic.get_language_name(lang)}).\n\n"
+        "✨ Rules:\n- Reply strictly in the user's input language.\n- Never translate or mix languages.\n"
+        "- Be warm, natural, and human-like.\n- Keep responses short, meaningful, and emotionally engaging.\n"
+        "- If user greets or chats casually, respond like a close supportive friend.\n"
+        "- If user asks questions, answer with helpful clarity.\n"
+    )
+
+
+def legacy_messages(history):
+    """Original layout: language in the first system line, last-10 sliding window."""
+    return [{"role": "system", "content": legacy_system_prompt(history[-1]["lang"])}] + [
+        {"role": m["role"], "content": m["content"]} for m in history[-10:]
+    ]
+
+
+def sliding_messages(history):
+    """Same system prompt, newest-first history inside the model's token budget."""
+    system = legacy_system_prompt(history[-1]["lang"])
+    remaining = get_token_budget(MODEL) - count_tokens(system) - MESSAGE_OVERHEAD_TOKENS
+    selected = []
+    for message in reversed(history):
+        remaining -= message_tokens(message)
+        if remaining < 0:
+            break
+        selected.append({"role": message["role"], "content": message["content"]})
+    return [{"role": "system", "content": system}] + selected[::-1]
+
+
+def _summary_prompt_tokens():
+    return sum(value for (name, stage, _), value in list(REGISTRY.counters.items())
+               if name == "prompt_tokens" and stage == "summary")
+
+
+def run_mode(mode, gateway, turns, seed=5):
+    rng = random.Random(seed)
+    history = []
+    rows = []
+    summary_turns = []
+    summarize_turns = core_logic.summarize_turns
+
+    def counting_summarizer(previous_summary, messages):
+        summary_turns.append(turn)
+        return summarize_turns(previous_summary, messages)
+
+    core_logic.summarize_turns = counting_summarizer
+    summary_tokens = _summary_prompt_tokens()
+    try:
+        for turn in range(turns):
+            rows.append(run_turn(mode, gateway, history, rng, turn))
+    finally:
+        core_logic.summarize_turns = summarize_turns
+    summary_tokens = _summary_prompt_tokens() - summary_tokens
+    # Summarizer blocking LLM call hai: lagaatar do turns par chale toh budget galat hai (har turn fold)
+    consecutive = [b for a, b in zip(summary_turns, summary_turns[1:]) if b - a == 1]
+    if consecutive:
+        raise RuntimeError(f"{mode}: summarizer ran on consecutive turns {consecutive}")
+    return rows, len(summary_turns), summary_tokens
+
+
+def run_turn(mode, gateway, history, rng, turn):
+    lang, text = USER_TURNS[rng.randrange(len(USER_TURNS))]
+    history.append({"role": "user", "content": f"{text} ({turn})", "lang": lang})
+    start = time.perf_counter()   # TTFT mein prompt build (aur blocking summarizer) bhi shaamil
+    if mode == "legacy":
+        messages = legacy_messages(history)
+    elif mode == "sliding":
+        messages = sliding_messages(history)
+    else:
+        messages = core_logic.build_messages_for_api(history, MODEL, user_id=f"bench-{mode}")
+    _, stream = gateway.open_stream(model=MODEL, messages=messages, stream_options={"include_usage": True})
+    ttft, usage = None, {}
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content and ttft is None:
+            ttft = time.perf_counter() - start
+        if getattr(chunk, "usage", None) is not None:
+            usage = core_logic.usage_fields(chunk.usage)
+    history.append({"role": "assistant", "content": ASSISTANT_REPLY, "lang": "ar"})
+    return ttft, usage.get("prompt_tokens", 0), usage.get("cached_tokens", 0)
+
+
+def summarize(mode, rows, summaries, summary_tokens):
+    price_in = MODEL_PRICES[MODEL][0] / 1_000_000
+    prompt = sum(r[1] for r in rows)
+    cached = sum(r[2] for r in rows)
+    # Summarizer calls bhi input tokens hain (same model, uncached)
+    cost = (prompt - cached + summary_tokens) * price_in + cached * price_in * CACHED_PRICE_FACTOR
+    ttfts = sorted(r[0] for r in rows)
+    return {
+        "mode": mode,
+        "turns": len(rows),
+        "prompt_tokens": prompt,
+        "cached_tokens": cached,
+        "cached_fraction": cached / prompt if prompt else 0.0,
+        "ttft_p50_ms": statistics.median(ttfts) * 1000,
+        "ttft_p95_ms": ttfts[min(len(ttfts) - 1, int(0.95 * len(ttfts)))] * 1000,
+        "input_cost_usd": cost,
+        "summaries": summaries,
+        "summary_tokens": summary_tokens,
+    }
+
+
+def run(turns=40, prefill_per_token=0.0002, ttft=0.05):
+    stub, base_url = start_stub_server(StubConfig(ttft=ttft, token_delay=0.0, prefix_cache=True,
+                                                  prefill_per_token=prefill_per_token))
+    previous_gateway, previous_db = llm_gateway._gateway, memory_handler.DB_PATH
+    gateway = llm_gateway._gateway = llm_gateway.LLMGateway("stub", base_url=base_url)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            memory_handler.DB_PATH = os.path.join(workdir, "bench_prompt.db")
+            results = [summarize(mode, *run_mode(mode, gateway, turns)) for mode in ("legacy", "sliding", "stable")]
+            legacy = results[0]
+            for row in results:
+                row["cost_vs_legacy"] = row["input_cost_usd"] / legacy["input_cost_usd"]
+                row["tokens_vs_legacy"] = row["prompt_tokens"] / legacy["prompt_tokens"]
+            memory_handler.close_connection()
+    finally:
+        llm_gateway._gateway, memory_handler.DB_PATH = previous_gateway, previous_db
+        stub.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--prefill-per-token", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'prompt tok':>11} {'cached':>8} {'cached %':>9} {'TTFT p50':>9} {'TTFT p95':>9} "
+          f"{'input $':>9} {'$ vs legacy':>12} {'summaries':>10}")
+    for r in run(args.turns, args.prefill_per_token):
+        print(f"{r['mode']:<8} {r['prompt_tokens']:>11} {r['cached_tokens']:>8} {r['cached_fraction']:>9.0%} "
+              f"{r['ttft_p50_ms']:>9.0f} {r['ttft_p95_ms']:>9.0f} {r['input_cost_usd']:>9.5f} "
+              f"{r['cost_vs_legacy'] - 1:>+12.0%} {r['summaries']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Streamlit rerun cost of app.py at growing history sizes (windowed vs full transcript), via AppTest.
+
+    python benchmarks/bench_rerun.py [--sizes 50 500 5000] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+
+def make_history(n):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant",
+         "content": f"رسالة رقم {i}: كيف حالك اليوم؟ message {i}", "lang": "ar"}
+        for i in range(n)
+    ]
+
+
+def time_rerun(size, window, runs):
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    at.session_state["messages"] = make_history(size)
+    if window is not None:
+        at.session_state["history_window"] = window
+    at.run()   # warm-up: imports + first render
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, len(at.chat_message)
+
+
+def run(sizes=(50, 500, 5000), runs=3):
+    # Temp cwd: app ki relative files (rafiq_memory.db, audio_cache/) repo mein na banein
+    previous_cwd = os.getcwd()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for size in sizes:
+                for mode, window in (("windowed", None), ("full", size)):
+                    ms, bubbles = time_rerun(size, window, runs)
+                    results.append({"messages": size, "mode": mode, "rerun_ms": ms, "bubbles": bubbles})
+        finally:
+            os.chdir(previous_cwd)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'mode':>9} {'rerun (ms)':>11} {'bubbles':>8}")
+    for r in run(args.sizes, args.runs):
+        print(f"{r['messages']:>9} {r['mode']:>9} {r['rerun_ms']:>11.1f} {r['bubbles']:>8}")
+
+
+if __name__ == '__main__':
+    main()
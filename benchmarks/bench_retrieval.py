@@ -0,0 +1,102 @@
+"""
+BM25 retrieval index: build time and query latency at growing corpus sizes.
+"multi_owner": wahi corpus OTHER_OWNERS users mein bata hua; har query ka matching doc "me" ka bhi hai, par
+dusre users ke paas usse behtar matches hain. owner_recall = kitni queries mein "me" ka doc mila.
+
+    python benchmarks/bench_retrieval.py [--sizes 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from components.retrieval import BM25Index
+
+AR_WORDS = ("الصبر الدعاء الرحمة القلب السلام العمل القهوة الحلويات الأمل الله الصلاة "
+            "الرزق الغربة الأهل ماليزيا سوريا الصديق الخوف الفرح الشكر النجاح التعب "
+            "اللهم اغفر لي وارحمني يسر أمري قوة صبر شفاء راحة").split()
+EN_WORDS = ("coffee latte waffle crepe shift manager customer hygiene patience family "
+            "homesick prayer hope work tired happy music oud song friend visa rent").split()
+RARE_VOCAB = 20000
+OTHER_OWNERS = 50
+CROWD_COPIES = 20             # har query ke itne behtar-match docs dusre users ke paas
+
+
+def make_vocab(rng):
+    # Real chats ki tarah Zipf-like: kuch common words + bahut saare rare words
+    letters = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+    rare = {"".join(rng.choices(letters, k=rng.randint(3, 7))) for _ in range(RARE_VOCAB)}
+    vocab = AR_WORDS + EN_WORDS + sorted(rare)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    return vocab, weights
+
+
+def make_doc(rng, vocab, weights):
+    return " ".join(rng.choices(vocab, weights=weights, k=rng.randint(8, 40)))
+
+
+def _latencies(index, query_texts, owner):
+    # Warm-up: pehli query par common terms ki impact lists banti hain
+    for query in query_texts:
+        index.search(query, k=3, owner=owner)
+    latencies = []
+    for query in query_texts:
+        start = time.perf_counter()
+        index.search(query, k=3, owner=owner)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "query_p50_ms": statistics.median(latencies),
+        "query_p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def run(sizes=(1000, 10000, 100000), queries=200):
+    rng = random.Random(7)
+    vocab, weights = make_vocab(rng)
+    query_texts = [make_doc(rng, vocab, weights)[:60] for _ in range(queries)]
+
+    results = []
+    for size in sizes:
+        docs = [make_doc(rng, vocab, weights) for _ in range(size)]
+        index = BM25Index()
+        start = time.perf_counter()
+        for i, doc in enumerate(docs):
+            index.add_document(f"doc:{i}", doc, owner="bench")
+        build_s = time.perf_counter() - start
+        results.append(dict({"docs": size, "mode": "single_owner", "build_s": build_s},
+                            **_latencies(index, query_texts, "bench")))
+
+        index = BM25Index()
+        for i, doc in enumerate(docs):
+            index.add_document(f"msg:user{i % OTHER_OWNERS}:{i}", doc, owner=f"user{i % OTHER_OWNERS}")
+        for i, query in enumerate(query_texts):
+            # Dusre users ke paas query ki exact copies (zyada score), "me" ka doc lamba (kam score)
+            for j in range(CROWD_COPIES):
+                index.add_document(f"msg:user{j}:q{i}", query, owner=f"user{j}")
+            index.add_document(f"msg:me:{i}", f"{query} {make_doc(rng, vocab, weights)}", owner="me")
+        found = sum(f"msg:me:{i}" in [doc_id for _, doc_id, _ in index.search(query, k=3, owner="me")]
+                    for i, query in enumerate(query_texts))
+        results.append(dict({"docs": size, "mode": "multi_owner", "owner_recall": found / len(query_texts)},
+                            **_latencies(index, query_texts, "me")))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'docs':>8} {'mode':<13} {'build (s)':>10} {'query p50 (ms)':>15} {'query p95 (ms)':>15} {'owner recall':>13}")
+    for r in run(args.sizes, args.queries):
+        build = f"{r['build_s']:>10.2f}" if "build_s" in r else f"{'':>10}"
+        recall = f"{r['owner_recall']:>13.0%}" if "owner_recall" in r else ""
+        print(f"{r['docs']:>8} {r['mode']:<13} {build} {r['query_p50_ms']:>15.2f} {r['query_p95_ms']:>15.2f} {recall}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Streaming STT on WAV fixtures: VAD segmentation, time-to-first-partial, per-segment real-time factor.
+
+    python benchmarks/bench_stt.py [fixture.wav ...] [--engine stub|whisper|vosk|sphinx] [--rtf 0.3]
+
+Without files a synthetic fixture is generated (speech-like bursts separated by pauses, over background noise).
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from stub_stt import StubSTTEngine
+
+from components import speech_stream
+from components.speech_stream import SAMPLE_RATE, StreamingTranscriber, wav_chunks, write_wav
+
+# (speech seconds, pause seconds) - teen utterances, ek lambi (partials ke liye)
+FIXTURE_PATTERN = ((1.2, 0.9), (3.5, 1.0), (0.8, 1.2))
+
+
+def make_fixture_wav(pattern=FIXTURE_PATTERN, seed=11):
+    """Vowel jaisa harmonic signal (syllable-rate amplitude modulation) + halka background noise."""
+    rng = np.random.default_rng(seed)
+    parts = [rng.normal(0, 60, int(0.5 * SAMPLE_RATE))]
+    for speech_s, pause_s in pattern:
+        t = np.arange(int(speech_s * SAMPLE_RATE)) / SAMPLE_RATE
+        pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t) ** 2
+        parts.append(6000 * voiced * envelope + rng.normal(0, 60, len(t)))
+        parts.append(rng.normal(0, 60, int(pause_s * SAMPLE_RATE)))
+    pcm = np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16).tobytes()
+    out = io.BytesIO()
+    write_wav(pcm, out)
+    return out.getvalue()
+
+
+def run_file(source, engine, name, realtime=True, chunk_ms=100):
+    transcriber = StreamingTranscriber(engine=engine)
+    stream_start = time.perf_counter()
+    first_partial = None
+    rows = []
+    for event in transcriber.transcribe_stream(wav_chunks(source, chunk_ms, realtime=realtime)):
+        if event["type"] == "partial" and first_partial is None:
+            first_partial = time.perf_counter() - stream_start
+        if event["type"] == "final":
+            rows.append({"file": name, "segment": event["segment"], "start_s": event["start"],
+                         "end_s": event["end"], "audio_s": event["audio_s"], "rtf": event["rtf"],
+                         "text": event["text"]})
+    total = time.perf_counter() - stream_start
+    return rows, {"file": name, "segments": len(rows), "first_partial_s": first_partial, "wall_s": total}
+
+
+def run(files=None, engine=None, rtf=0.3, realtime=True):
+    engine = engine or StubSTTEngine(rtf=rtf)
+    sources = [(os.path.basename(f), f) for f in files] if files else [("synthetic.wav", make_fixture_wav())]
+    results = []
+    for name, source in sources:
+        rows, summary = run_file(source, engine, name, realtime=realtime)
+        for row in rows:
+            row.pop("text")
+            results.append(row)
+        results.append({"file": name, "mode": "summary", **{k: v for k, v in summary.items() if k != "file"}})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*", help="16-bit PCM WAV fixtures (default: synthetic)")
+    parser.add_argument("--engine", default="stub", choices=["stub", *speech_stream.ENGINES])
+    parser.add_argument("--rtf", type=float, default=0.3, help="stub engine ka real-time factor")
+    parser.add_argument("--fast", action="store_true", help="chunks realtime speed par nahi, jitni jaldi ho sake")
+    args = parser.parse_args()
+
+    engine = StubSTTEngine(rtf=args.rtf) if args.engine == "stub" else speech_stream.ENGINES[args.engine]()
+    sources = [(os.path.basename(f), f) for f in args.files] or [("synthetic.wav", make_fixture_wav())]
+    for name, source in sources:
+        rows, summary = run_file(source, engine, name, realtime=not args.fast)
+        print(f"\n{name}")
+        print(f"{'seg':>4} {'start (s)':>10} {'end (s)':>9} {'audio (s)':>10} {'RTF':>6}  text")
+        for row in rows:
+            print(f"{row['segment']:>4} {row['start_s']:>10.2f} {row['end_s']:>9.2f} {row['audio_s']:>10.2f} "
+                  f"{row['rtf']:>6.2f}  {row['text']}")
+        first = summary["first_partial_s"]
+        print(f"segments={summary['segments']}  first partial={'n/a' if first is None else f'{first:.2f}s'}  "
+              f"wall={summary['wall_s']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Audio cache with the offline stub TTS engine: cold synthesis vs memory hit vs disk hit.
+
+    python benchmarks/bench_tts.py [--messages 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_tts import StubTTSEngine
+
+from components.audio_cache import AudioCache, DiskStore, MemoryLRU
+
+REPLY = "مرحبًا يا غدير! أتمنى أن يكون يومك جميلًا. لا تنسي أن تأخذي استراحة قصيرة وتشربي الماء. "
+
+
+def _median_ms(fn, items):
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def run(messages=20):
+    texts = [f"{REPLY} ({i})" for i in range(messages)]
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = StubTTSEngine()
+        cache = AudioCache(engine=engine, memory=MemoryLRU(), disk=DiskStore(workdir))
+        cold = _median_ms(lambda t: cache.get_audio(t, "ar"), texts)
+        memory_hit = _median_ms(lambda t: cache.get_audio(t, "ar"), texts)
+
+        # Naya process simulate: khali memory tier, wahi disk
+        cache = AudioCache(engine=engine, memory=MemoryLRU(), disk=DiskStore(workdir))
+        disk_hit = _median_ms(lambda t: cache.get_audio(t, "ar"), texts)
+
+    return [
+        {"mode": "cold_synthesis", "messages": messages, "p50_ms": cold},
+        {"mode": "memory_hit", "messages": messages, "p50_ms": memory_hit},
+        {"mode": "disk_hit", "messages": messages, "p50_ms": disk_hit},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'mode':<16} {'p50 (ms)':>10}")
+    for r in run(args.messages):
+        print(f"{r['mode']:<16} {r['p50_ms']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
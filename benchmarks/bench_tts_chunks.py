@@ -0,0 +1,93 @@
+"""
+Time-to-first-audio: poora reply ek TTS call mein (purana play button) vs sentence chunks parallel mein.
+
+    python benchmarks/bench_tts_chunks.py [--repeat 3] [--request-latency 0.25]
+
+Stub engine gTTS jaisa behave karta hai: har 100 chars ek request, requests ek ke baad ek.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_tts import StubTTSEngine
+
+from components.audio_cache import AudioCache, DiskStore, MemoryLRU
+from components.tts_pipeline import SpeechPipeline, concat_mp3, split_for_speech
+
+SENTENCES = [
+    "مرحبًا يا غدير! كيف حالك اليوم؟",
+    "أتمنى أن يكون يومك جميلًا ومليئًا بالطمأنينة، وأن تجدي وقتًا للراحة بين الدراسة والعمل.",
+    "Remember to drink some water and take a short walk when you feel tired.",
+    "لا تنسي أن الله معك دائمًا، وأن كل صعوبة يأتي بعدها يسر.",
+    "إذا احتجتِ إلى أي مساعدة في الدراسة أو التخطيط ليومك، فأنا هنا دائمًا من أجلك.",
+]
+SIZES = (1, 5, 15)   # reply mein kitne sentences
+
+
+def _reply(sentences):
+    return " ".join(SENTENCES[i % len(SENTENCES)] for i in range(sentences))
+
+
+def _single_call(engine, workdir, text):
+    cache = AudioCache(engine=engine, memory=MemoryLRU(), disk=DiskStore(workdir))
+    start = time.perf_counter()
+    cache.get_audio(text, "ar")
+    total = time.perf_counter() - start
+    return total, total, 1
+
+
+def _chunked(engine, workdir, text):
+    pipeline = SpeechPipeline(AudioCache(engine=engine, memory=MemoryLRU(), disk=DiskStore(workdir)))
+    start = time.perf_counter()
+    chunks = pipeline.submit(text, "ar")
+    wait([chunks[0][2]], return_when=FIRST_COMPLETED)
+    first_audio = time.perf_counter() - start
+    concat_mp3([future.result() for _, _, future in chunks])
+    return first_audio, time.perf_counter() - start, len(chunks)
+
+
+MODES = {"single_call": _single_call, "chunked": _chunked}
+
+
+def run(repeat=3, request_latency=0.25, sizes=SIZES):
+    rows = []
+    for sentences in sizes:
+        text = _reply(sentences)
+        for mode, fn in MODES.items():
+            first, total = [], []
+            for _ in range(repeat):
+                engine = StubTTSEngine(base_latency=request_latency, latency_per_char=0.0005, request_chars=100)
+                with tempfile.TemporaryDirectory() as workdir:
+                    first_audio, elapsed, chunks = fn(engine, workdir, text)
+                first.append(first_audio)
+                total.append(elapsed)
+            rows.append({
+                "mode": mode, "size": len(text), "chunks": chunks,
+                "first_audio_ms": statistics.median(first) * 1000,
+                "total_ms": statistics.median(total) * 1000,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--request-latency", type=float, default=0.25)
+    args = parser.parse_args()
+
+    print(f"languages per chunk ({len(SENTENCES)}-sentence reply): "
+          f"{[lang for _, lang in split_for_speech(_reply(len(SENTENCES)))]}")
+    print(f"{'mode':<12} {'chars':>6} {'chunks':>7} {'first audio (ms)':>17} {'total (ms)':>11}")
+    for r in run(args.repeat, args.request_latency):
+        print(f"{r['mode']:<12} {r['size']:>6} {r['chunks']:>7} {r['first_audio_ms']:>17.1f} {r['total_ms']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Cold-start profiler: import time per module (python -X importtime) for app.py's import graph.
+
+    python benchmarks/profile_startup.py [--top 25] [--json startup.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# app.py top-level imports, plus the lazily loaded heavy stacks for comparison
+APP_IMPORTS = [
+    "streamlit",
+    "components.core_logic",
+    "components.voice_handler",
+    "components.lang_handler",
+    "components.response_cache",
+]
+LAZY_IMPORTS = [
+    "components.llm_gateway",
+    "components.image_processor",
+    "speech_recognition",
+    "langid",
+]
+
+
+def import_times(statement, startup=()):
+    """
+    Fresh interpreter mein statement chalata hai. Returns ({module: (self_us, cumulative_us)}, root_us) -
+    root_us = sirf top-level imports ka cumulative (nested modules unke parent mein pehle se shamil hain),
+    `startup` modules (interpreter khud load karta hai, e.g. site) chhod kar.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    times = {}
+    root_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+        # importtime nesting ko name ke aage spaces se dikhata hai
+        if not name[1:].startswith(" ") and name.strip() not in startup:
+            root_us += int(cumulative_us)
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1], file=sys.stderr)
+    return times, root_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=25, help="slowest modules to list (by self time)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    startup, _ = import_times("pass")
+    app_times, app_root_us = import_times("; ".join(f"import {m}" for m in APP_IMPORTS), startup)
+    report = {
+        "app_imports_ms": {m: app_times.get(m, (0, 0))[1] / 1000 for m in APP_IMPORTS},
+        "lazy_imports_ms": {},
+        "slowest_modules_ms": {},
+    }
+    for module in LAZY_IMPORTS:
+        times, _ = import_times(f"import {module}")
+        report["lazy_imports_ms"][module] = times.get(module, (0, 0))[1] / 1000
+    slowest = sorted(app_times.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    report["slowest_modules_ms"] = {name: self_us / 1000 for name, (self_us, _) in slowest}
+    # Per-module cumulative overlap karte hain (lang_handler core_logic ke andar bhi gina jata hai), isliye
+    # total unka sum nahi balki poore import statement ka ek root measurement hai
+    report["app_total_ms"] = app_root_us / 1000
+
+    print("App cold-start imports (cumulative ms, in import order; overlapping, nested modules repeat):")
+    for module, ms in report["app_imports_ms"].items():
+        print(f"  {module:<32} {ms:>9.1f}")
+    print(f"  {'total (root, no double count)':<32} {report['app_total_ms']:>9.1f}")
+    print("\nLoaded on first use (standalone cumulative ms):")
+    for module, ms in report["lazy_imports_ms"].items():
+        print(f"  {module:<32} {ms:>9.1f}")
+    print(f"\nSlowest modules by self time (top {args.top}):")
+    for module, ms in report["slowest_modules_ms"].items():
+        print(f"  {module:<48} {ms:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Offline benchmark suite: saare scenarios chala kar machine-readable JSON likhta hai, optional regression gate ke saath.
+
+    python benchmarks/run_all.py [--quick] [--only chat memory ...] [--baseline results/base.json --max-regression 0.2]
+
+Koi network nahi chahiye: LLM calls benchmarks/stub_llm_server.py par jaati hain, TTS benchmarks/stub_tts.py se.
+Jo scenario is machine par nahi chal sakta (e.g. Tesseract missing) woh "skipped" record hota hai.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import traceback
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, '..')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+# name -> (module, full kwargs, --quick kwargs)
+SCENARIOS = {
+    "chat": ("bench_chat", {"requests": 50}, {"requests": 10}),
+    "prompt_cache": ("bench_prompt_cache", {"turns": 40}, {"turns": 20}),
+    "api": ("bench_api", {"users": 50, "requests": 4}, {"users": 20, "requests": 2}),
+    "memory": ("bench_memory", {"sizes": (10, 1000, 100000), "turns": 20}, {"sizes": (10, 1000), "turns": 5}),
+    "lang": ("bench_lang", {"messages": 2000}, {"messages": 300}),
+    "retrieval": ("bench_retrieval", {"sizes": (1000, 10000, 100000), "queries": 200},
+                  {"sizes": (1000, 10000), "queries": 50}),
+    "tts": ("bench_tts", {"messages": 20}, {"messages": 5}),
+    "tts_chunks": ("bench_tts_chunks", {"repeat": 3}, {"repeat": 1, "sizes": (1, 5)}),
+    "stt": ("bench_stt", {"realtime": True}, {"realtime": False}),
+    "ocr": ("bench_ocr", {"repeat": 3}, {"repeat": 1}),
+    "rerun": ("bench_rerun", {"sizes": (50, 500, 5000), "runs": 3}, {"sizes": (50, 500), "runs": 1}),
+}
+
+# Rows ko baseline se match karne ke liye identity keys; baaki numeric keys metrics hain
+# (size keys bhi: --quick run ke 20 turns full baseline ke 40 turns se match na hon)
+ROW_ID_KEYS = ("file", "segment", "mode", "messages", "size", "docs", "requests", "images", "turns", "users")
+# Sirf yahi metrics gate hote hain, apni direction ke saath (-1 = kam behtar, +1 = zyada behtar).
+# Baaki numeric fields (start_s/end_s, bubbles, chunks, cached_tokens, ...) descriptive hain, gate nahi hote.
+METRIC_DIRECTIONS = {
+    "total_s": -1, "build_s": -1, "wall_s": -1, "first_partial_s": -1, "rtf": -1,
+    "errors": -1, "prompt_tokens": -1, "input_cost_usd": -1, "cost_vs_legacy": -1, "tokens_vs_legacy": -1,
+    "ok": +1, "cached_fraction": +1, "owner_recall": +1,
+}
+METRIC_SUFFIX_DIRECTIONS = (("_per_s", +1), ("_ms", -1))
+
+
+def metric_direction(key):
+    """-1 / +1 agar metric gate hota hai, warna None."""
+    if key in METRIC_DIRECTIONS:
+        return METRIC_DIRECTIONS[key]
+    for suffix, direction in METRIC_SUFFIX_DIRECTIONS:
+        if key.endswith(suffix):
+            return direction
+    return None
+
+
+def skip_reason(name):
+    if name == "ocr" and shutil.which("tesseract") is None:
+        return "tesseract binary not found on PATH"
+    return None
+
+
+def run_scenario(name, quick):
+    module_name, full_kwargs, quick_kwargs = SCENARIOS[name]
+    reason = skip_reason(name)
+    if reason:
+        return {"status": "skipped", "reason": reason}
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+        rows = module.run(**(quick_kwargs if quick else full_kwargs))
+    except ImportError as e:
+        return {"status": "skipped", "reason": f"missing dependency: {e}"}
+    except Exception as e:
+        traceback.print_exc()
+        return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+    return {"status": "ok", "wall_s": time.perf_counter() - start, "rows": rows}
+
+
+def _row_id(row):
+    return tuple((k, row[k]) for k in ROW_ID_KEYS if k in row)
+
+
+def compare(current, baseline, max_regression):
+    """Baseline ke against har gated metric (METRIC_DIRECTIONS) check karta hai. Returns a list of regression strings."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if result.get("status") != "ok" or not base or base.get("status") != "ok":
+            continue
+        base_rows = {_row_id(row): row for row in base["rows"]}
+        for row in result["rows"]:
+            base_row = base_rows.get(_row_id(row))
+            if base_row is None:
+                continue
+            for key, value in row.items():
+                old = base_row.get(key)
+                direction = metric_direction(key)
+                if direction is None or key in ROW_ID_KEYS:
+                    continue
+                if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                    continue
+                label = ", ".join(f"{k}={v}" for k, v in _row_id(row))
+                if not old:
+                    # 0 se ratio nahi banta: kam-behtar counter (errors) ka 0 -> N seedha regression hai
+                    if direction < 0 and value > 0:
+                        regressions.append(f"{name} [{label}] {key}: 0 -> {value:.4g} (new)")
+                    continue
+                change = (old - value) / old if direction > 0 else (value - old) / old
+                if change > max_regression:
+                    regressions.append(f"{name} [{label}] {key}: {old:.4g} -> {value:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="sirf yeh scenarios chalao")
+    parser.add_argument("--quick", action="store_true", help="chhote sizes (CI smoke run)")
+    parser.add_argument("--output", help=f"result JSON path (default: {RESULTS_DIR}/<timestamp>.json)")
+    parser.add_argument("--baseline", help="pichla result JSON; regression par exit code 1")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown fraction (default 0.2)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:   # pehle padh lo, kyunki baseline latest.json bhi ho sakta hai
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    names = args.only or list(SCENARIOS)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "quick": args.quick,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": {},
+    }
+    for name in names:
+        print(f"--- {name} ---", flush=True)
+        result = run_scenario(name, args.quick)
+        report["scenarios"][name] = result
+        if result["status"] == "ok":
+            for row in result["rows"]:
+                print("  " + ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+        else:
+            print(f"  {result['status']}: {result['reason']}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    for path in (output, os.path.join(RESULTS_DIR, "latest.json")):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nResults written to {output}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.max_regression:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions over {args.max_regression:.0%} against {args.baseline}")
+
+    if any(r["status"] == "error" for r in report["scenarios"].values()):
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
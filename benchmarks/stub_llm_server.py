@@ -0,0 +1,217 @@
+"""
+Local OpenAI-compatible stub for /api/v1/chat/completions (streaming and non-streaming).
+
+    python benchmarks/stub_llm_server.py --port 8765 --latency 0.2 --ttft 0.05
+    RAFIQ_LLM_BASE_URL=http://127.0.0.1:8765/api/v1 OPENROUTER_API_KEY=stub streamlit run app.py
+
+Per-model latency / failure rate: --model-latency openai/gpt-4o=2.0 --fail-rate 0.1
+Tail latency (hedging ke liye): --straggler-rate 0.05 --straggler-delay 1.0
+Provider prompt caching: --prefix-cache --prefill-per-token 0.0002 (uncached prompt tokens par extra latency)
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from components.context_builder import count_tokens
+
+DEFAULT_REPLY = "مرحبًا! أنا رفيق، كيف يمكنني مساعدتك اليوم؟ I'm here for you."
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, ttft=0.05, token_delay=0.005, fail_rate=0.0,
+                 model_latency=None, reply=DEFAULT_REPLY, cached_tokens=0, prefix_cache=False,
+                 prefill_per_token=0.0, straggler_rate=0.0, straggler_delay=0.0):
+        self.latency = latency              # non-streaming: poore jawab tak
+        self.ttft = ttft                    # streaming: pehla chunk
+        self.token_delay = token_delay      # streaming: chunks ke beech
+        self.fail_rate = fail_rate          # itne fraction requests par 500
+        self.model_latency = model_latency or {}
+        self.reply = reply
+        self.cached_tokens = cached_tokens
+        self.prefix_cache = prefix_cache            # OpenAI jaisa: pichle prompts ka longest common prefix
+        self.prefill_per_token = prefill_per_token  # har uncached prompt token ka extra time
+        self.straggler_rate = straggler_rate        # itne fraction requests pehle token se pehle ...
+        self.straggler_delay = straggler_delay      # ... itna extra atakti hain (tail latency)
+        self.seen_prompts = defaultdict(lambda: deque(maxlen=PREFIX_CACHE_ENTRIES))
+        self.requests = 0
+        self.cancelled_streams = 0          # client ne beech mein band kiye streams
+        self.lock = threading.Lock()
+
+
+PREFIX_CACHE_ENTRIES = 64
+PREFIX_CACHE_MIN_TOKENS = 1024     # OpenAI: 1024 tokens se kam prompt cache nahi hota
+PREFIX_CACHE_BLOCK = 128           # ... aur cache 128-token blocks mein badhta hai
+
+
+def _count_tokens(text):
+    # App ka hi counter (tiktoken ya script-aware estimate): budgets aur 1024-token cache limit ek hi unit mein
+    return max(1, count_tokens(text))
+
+
+def _cached_prefix_tokens(config, model, prompt_text):
+    """Is model ke recent prompts ke saath longest common prefix (block-aligned tokens)."""
+    with config.lock:
+        seen = list(config.seen_prompts[model])
+        config.seen_prompts[model].append(prompt_text)
+    best = 0
+    for previous in seen:
+        common = len(os.path.commonprefix([previous, prompt_text]))
+        best = max(best, common)
+    tokens = _count_tokens(prompt_text[:best]) if best else 0
+    if tokens < PREFIX_CACHE_MIN_TOKENS:
+        return 0
+    return tokens - tokens % PREFIX_CACHE_BLOCK
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, jaise real provider
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            with config.lock:
+                config.requests += 1
+
+            model = request.get("model", "stub")
+            if random.random() < config.fail_rate:
+                self._send_json(500, {"error": {"message": "stub upstream error"}})
+                return
+
+            prompt_text = "".join(
+                m.get("role", "") + "\x00" + (m["content"] if isinstance(m.get("content"), str)
+                                               else "".join(part.get("text", "") for part in m.get("content") or []))
+                for m in request.get("messages", [])
+            )
+            prompt_tokens = _count_tokens(prompt_text)
+            cached = config.cached_tokens
+            if config.prefix_cache:
+                cached = min(prompt_tokens, _cached_prefix_tokens(config, model, prompt_text))
+            prefill = config.prefill_per_token * (prompt_tokens - cached)
+            if random.random() < config.straggler_rate:
+                prefill += config.straggler_delay
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": _count_tokens(config.reply),
+                "total_tokens": prompt_tokens + _count_tokens(config.reply),
+                "prompt_tokens_details": {"cached_tokens": cached},
+            }
+            base = {"id": f"stub-{config.requests}", "created": int(time.time()), "model": model}
+
+            if request.get("stream"):
+                self._stream(request, model, base, usage, prefill)
+                return
+
+            time.sleep(config.model_latency.get(model, config.latency) + prefill)
+            self._send_json(200, dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": config.reply},
+                "finish_reason": "stop",
+            }]))
+
+        def _stream(self, request, model, base, usage, prefill=0.0):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            time.sleep(config.model_latency.get(model, config.ttft) + prefill)
+
+            def send(chunk):
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            try:
+                words = config.reply.split(" ")
+                for i, word in enumerate(words):
+                    delta = word if i == 0 else f" {word}"
+                    send(dict(base, object="chat.completion.chunk", choices=[{
+                        "index": 0, "delta": {"content": delta}, "finish_reason": None,
+                    }]))
+                    time.sleep(config.token_delay)
+                final = dict(base, object="chat.completion.chunk", choices=[{
+                    "index": 0, "delta": {}, "finish_reason": "stop",
+                }])
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    final["usage"] = usage
+                send(final)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                with config.lock:   # client ne stream cancel kar diya
+                    config.cancelled_streams += 1
+            self.close_connection = True
+
+    return Handler
+
+
+def start_stub_server(config=None, host="127.0.0.1", port=0):
+    """Background thread mein server start karta hai. Returns (server, base_url)."""
+    config = config or StubConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api/v1"
+
+
+def _parse_model_latency(items):
+    result = {}
+    for item in items or []:
+        model, _, seconds = item.rpartition("=")
+        result[model] = float(seconds)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--model-latency", nargs="*", metavar="MODEL=SECONDS")
+    parser.add_argument("--prefix-cache", action="store_true", help="simulate provider prompt caching")
+    parser.add_argument("--prefill-per-token", type=float, default=0.0, help="seconds per uncached prompt token")
+    parser.add_argument("--straggler-rate", type=float, default=0.0, help="fraction of requests delayed")
+    parser.add_argument("--straggler-delay", type=float, default=0.0, help="extra seconds for a straggler")
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency, ttft=args.ttft, token_delay=args.token_delay,
+                        fail_rate=args.fail_rate, model_latency=_parse_model_latency(args.model_latency),
+                        prefix_cache=args.prefix_cache, prefill_per_token=args.prefill_per_token,
+                        straggler_rate=args.straggler_rate, straggler_delay=args.straggler_delay)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f"Stub LLM server on http://{args.host}:{args.port}/api/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
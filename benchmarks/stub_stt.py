@@ -0,0 +1,24 @@
+"""
+Offline stand-in for a speech-to-text engine: sleeps rtf * audio duration, returns a fixed transcript.
+
+    from components.speech_stream import set_stt_engine
+    set_stt_engine(StubSTTEngine(rtf=0.3))
+"""
+import time
+
+SAMPLE_WIDTH = 2
+
+
+class StubSTTEngine:
+    name = "stub"
+
+    def __init__(self, rtf=0.3, text="كيف حالك"):
+        self.rtf = rtf
+        self.text = text
+        self.calls = 0
+
+    def transcribe(self, pcm, sample_rate, language=None):
+        self.calls += 1
+        audio_s = len(pcm) / (sample_rate * SAMPLE_WIDTH)
+        time.sleep(audio_s * self.rtf)
+        return f"{self.text} ({audio_s:.1f}s)"
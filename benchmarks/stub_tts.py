@@ -0,0 +1,33 @@
+"""
+Offline stand-in for gTTS: returns MP3-framed bytes after a configurable synthesis delay.
+
+    from components.audio_cache import set_audio_engine
+    set_audio_engine(StubTTSEngine(latency_per_char=0.002))
+"""
+import math
+import time
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz frame header; har frame 417 bytes (~26 ms audio)
+_FRAME_HEADER = b"\xff\xfb\x90\x64"
+_FRAME_BYTES = 417
+
+
+class StubTTSEngine:
+    """
+    request_chars set ho toh gTTS jaisa: text us size ke requests mein tootta hai aur har request
+    base_latency leti hai, ek ke baad ek (gTTS ke 100-char sequential requests).
+    """
+
+    def __init__(self, base_latency=0.05, latency_per_char=0.002, frames_per_char=2, request_chars=None):
+        self.base_latency = base_latency
+        self.request_chars = request_chars
+        self.latency_per_char = latency_per_char
+        self.frames_per_char = frames_per_char
+        self.calls = 0
+
+    def synthesize(self, text, language, slow=False):
+        self.calls += 1
+        requests = math.ceil(len(text) / self.request_chars) if self.request_chars else 1
+        time.sleep(self.base_latency * requests + self.latency_per_char * len(text) * (2 if slow else 1))
+        frame = _FRAME_HEADER + bytes(_FRAME_BYTES - len(_FRAME_HEADER))
+        return frame * max(1, len(text) * self.frames_per_char)
@@ -0,0 +1,452 @@
+"""
+Headless multi-user HTTP API for Rafiq (asyncio: Starlette + uvicorn, dono Streamlit ke saath install hote hain).
+
+    python -m components.api_server [--host 127.0.0.1] [--port 8000]
+
+Endpoints:
+    POST   /v1/chat                {"user_id", "message", "model"?, "stream"?}  -> JSON, ya SSE jab stream=true
+    POST   /v1/ocr                 raw image bytes (body)                       -> {"text"}
+    POST   /v1/tts                 {"text", "language"?, "slow"?}               -> audio/mpeg
+    GET    /v1/users/{user_id}/history?limit=50
+    DELETE /v1/users/{user_id}/history
+    GET    /healthz, GET /metrics (Prometheus text)
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from components import memory_handler
+from components.core_logic import get_ai_response, prewarm_in_background, stream_ai_response
+from components.lang_handler import detect_language
+from components.metrics import REGISTRY, span
+
+# --- Server settings ---
+LLM_CONCURRENCY = int(os.getenv("RAFIQ_API_LLM_CONCURRENCY", "8"))     # ek saath upstream LLM calls
+LLM_QUEUE_LIMIT = int(os.getenv("RAFIQ_API_LLM_QUEUE", "32"))          # itne requests slot ka wait kar sakte hain
+QUEUE_TIMEOUT = float(os.getenv("RAFIQ_API_QUEUE_TIMEOUT", "15"))      # is se zyada wait = 429
+OCR_WORKERS = int(os.getenv("RAFIQ_API_OCR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+OCR_QUEUE_LIMIT = 8
+TTS_CONCURRENCY = 4
+TTS_QUEUE_LIMIT = 16
+MAX_SESSIONS = 1000            # memory mein itne users; baaki DB se dobara load hote hain
+SESSION_HISTORY = 100          # session load par itne recent messages (purane rolling summary mein)
+MAX_MESSAGE_CHARS = 8000
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+DEFAULT_MODEL = "openai/gpt-4o-mini"
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Server busy, retry later.")
+        self.retry_after = retry_after
+
+
+class UpstreamError(Exception):
+    """LLM call fail hui (retries/fallback ke baad bhi): HTTP 502, turn save nahi hota."""
+
+
+# --- 1. Bounded concurrency + queue (backpressure) ---
+class AdmissionPool:
+    """
+    `limit` kaam ek saath chalte hain, `queue_limit` tak wait karte hain; queue bhari ho
+    ya wait `queue_timeout` se lamba ho toh Overloaded (HTTP 429).
+    """
+
+    def __init__(self, name, limit, queue_limit, queue_timeout=QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def full(self):
+        return self.waiting >= self.queue_limit and self._semaphore.locked()
+
+    def reject(self):
+        self.rejected += 1
+        return Overloaded(retry_after=max(1, int(self.queue_timeout / 2)))
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.full():
+            raise self.reject()
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(retry_after=int(self.queue_timeout))
+        finally:
+            self.waiting -= 1
+        REGISTRY.record("api_queue_wait", time.perf_counter() - start, {"pool": self.name})
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def snapshot(self):
+        return {"active": self.active, "waiting": self.waiting, "limit": self.limit,
+                "queue_limit": self.queue_limit, "rejected": self.rejected}
+
+
+# --- 2. Per-user sessions (rafiq_memory.db se) ---
+class UserSession:
+    def __init__(self, user_id, messages):
+        self.user_id = user_id
+        self.messages = messages
+        self.lock = asyncio.Lock()    # ek user ke turns order mein; alag users parallel
+        self.last_used = time.time()
+
+
+class SessionStore:
+    def __init__(self, executor, max_sessions=MAX_SESSIONS):
+        self.executor = executor
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._loading = {}
+
+    async def get(self, user_id):
+        session = self._sessions.get(user_id)
+        if session is None:
+            # Ek user ke do parallel requests DB se do baar load na karein
+            future = self._loading.get(user_id)
+            if future is None:
+                future = asyncio.get_running_loop().run_in_executor(
+                    self.executor, memory_handler.load_tail, user_id, SESSION_HISTORY)
+                self._loading[user_id] = future
+            try:
+                messages = await future
+            finally:
+                self._loading.pop(user_id, None)
+            session = self._sessions.get(user_id) or UserSession(user_id, messages or [])
+            self._sessions[user_id] = session
+            self._evict()
+        self._sessions.move_to_end(user_id)
+        session.last_used = time.time()
+        return session
+
+    def _evict(self):
+        # History DB mein already hai, toh session drop karna safe hai (busy sessions chhod kar)
+        for user_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if not self._sessions[user_id].lock.locked():
+                del self._sessions[user_id]
+
+    def drop(self, user_id):
+        self._sessions.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# --- 3. Workers (OCR process pool ke liye top-level function) ---
+def _ocr_job(data):
+    from components.ocr_pipeline import ocr_image_bytes  # worker process mein cv2/pytesseract
+    # Yeh khud ek pool worker hai: strips yahin serially, andar doosra process pool nahi (CPU oversubscription)
+    return ocr_image_bytes(data, parallel=False)
+
+
+def _tts_job(text, language, slow):
+    from components.tts_pipeline import get_tts_pipeline
+    return get_tts_pipeline().synthesize(text, language=language, slow=slow)
+
+
+class RafiqService:
+    def __init__(self, llm_concurrency=LLM_CONCURRENCY, llm_queue=LLM_QUEUE_LIMIT, ocr_workers=OCR_WORKERS):
+        self.llm_concurrency = llm_concurrency
+        self.llm_queue = llm_queue
+        self.ocr_workers = ocr_workers
+        self.started_at = time.time()
+
+    async def start(self):
+        # Pools event loop ke andar banne chahiye (asyncio.Semaphore loop se bandhta hai)
+        self.llm_pool = AdmissionPool("llm", self.llm_concurrency, self.llm_queue)
+        self.ocr_pool = AdmissionPool("ocr", self.ocr_workers, OCR_QUEUE_LIMIT)
+        self.tts_pool = AdmissionPool("tts", TTS_CONCURRENCY, TTS_QUEUE_LIMIT)
+        # Blocking LLM / SQLite / TTS calls threads mein; OCR (CPU-bound) alag processes mein
+        self.io_executor = ThreadPoolExecutor(max_workers=self.llm_concurrency + TTS_CONCURRENCY + 4,
+                                              thread_name_prefix="rafiq-api")
+        self.ocr_executor = ProcessPoolExecutor(max_workers=self.ocr_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        self.sessions = SessionStore(self.io_executor)
+        memory_handler.init_db()
+        # Traffic lene se pehle LLM client + langid model load (Streamlit ki tarah background mein nahi)
+        await self.run_blocking(prewarm_in_background().join)
+
+    async def stop(self):
+        self.ocr_executor.shutdown(wait=False, cancel_futures=True)
+        self.io_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run_blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, fn, *args)
+
+    async def detect_language(self, text):
+        # langid ka pehla load kai second leta hai - event loop par nahi
+        return (await self.run_blocking(detect_language, text))[0]
+
+    # --- Chat ---
+    async def user_message(self, text):
+        return {"role": "user", "content": text, "lang": await self.detect_language(text)}
+
+    async def commit_turn(self, session, user_message, reply):
+        """Kamyaab turn: user + assistant dono ek saath session aur DB mein. Failed turn kuch save nahi karta."""
+        message = {"role": "assistant", "content": reply, "lang": await self.detect_language(reply)}
+        session.messages.extend([user_message, message])
+        await self.run_blocking(memory_handler.append_messages, session.user_id, [user_message, message])
+        if len(session.messages) > 2 * SESSION_HISTORY:
+            # In-memory list bounded rahe; context builder ke liye itna kaafi hai
+            del session.messages[:-SESSION_HISTORY]
+        return message
+
+    async def chat(self, session, text, model):
+        async with session.lock:
+            async with self.llm_pool.slot():
+                user_message = await self.user_message(text)
+                stats = {}
+                reply = await self.run_blocking(get_ai_response, session.messages + [user_message], model,
+                                                session.user_id, None, stats)
+            if stats.get("error"):
+                # get_ai_response error ko reply text bana deta hai - woh na history mein jaye na 200 ke saath
+                raise UpstreamError(stats["error"])
+            return await self.commit_turn(session, user_message, reply)
+
+    async def chat_stream(self, session, text, model):
+        """SSE events: {"delta": ...} har token par, aakhir mein {"done": true, "stats": {...}}."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancel = threading.Event()
+        stats = {}
+        done = object()
+
+        def pump(history):
+            # Sync generator thread mein; har delta event loop ki queue mein
+            generator = stream_ai_response(history, model=model, stats=stats, user_id=session.user_id)
+            try:
+                for delta in generator:
+                    if cancel.is_set():
+                        generator.close()   # GeneratorExit -> upstream stream band, stats["cancelled"]
+                        break
+                    if stats.get("error"):
+                        break               # error text delta nahi, aakhri event mein jata hai
+                    loop.call_soon_threadsafe(queue.put_nowait, delta)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        async with session.lock:
+            async with self.llm_pool.slot():
+                user_message = await self.user_message(text)
+                worker = loop.run_in_executor(self.io_executor, pump, session.messages + [user_message])
+                parts = []
+                try:
+                    while True:
+                        item = await queue.get()
+                        if item is done:
+                            break
+                        parts.append(item)
+                        yield _sse({"delta": item})
+                    await worker
+                finally:
+                    cancel.set()
+                    if not worker.done():
+                        # Client chala gaya: slot tab tak pakde raho jab tak upstream stream band na ho
+                        try:
+                            await worker
+                        except Exception:
+                            pass
+            if stats.get("error"):
+                # Headers (200) ja chuke hain: error aakhri event mein, aur turn save nahi hota
+                yield _sse({"done": True, "error": stats["error"], "status": 502, "stats": _public_stats(stats)})
+            elif not stats.get("cancelled"):
+                message = await self.commit_turn(session, user_message, "".join(parts).strip())
+                yield _sse({"done": True, "lang": message["lang"], "stats": _public_stats(stats)})
+
+    # --- OCR / TTS ---
+    async def ocr(self, data):
+        async with self.ocr_pool.slot():
+            with span("api_ocr") as s:
+                s.set(input_bytes=len(data))
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.ocr_executor, _ocr_job, data)
+
+    async def tts(self, text, language, slow):
+        async with self.tts_pool.slot():
+            return await self.run_blocking(_tts_job, text, language, slow)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "sessions": len(self.sessions),
+            "pools": {pool.name: pool.snapshot() for pool in (self.llm_pool, self.ocr_pool, self.tts_pool)},
+        }
+
+
+def _sse(payload):
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _public_stats(stats):
+    return {k: stats.get(k) for k in ("model", "ttft", "total", "chunks", "cache_hit", "error", "usage")}
+
+
+def _error(status, message, **headers):
+    return JSONResponse({"error": message}, status_code=status, headers=headers or None)
+
+
+# --- 4. HTTP layer ---
+def create_app(service=None):
+    service = service or RafiqService()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await service.start()
+        yield
+        await service.stop()
+
+    async def read_json(request):
+        try:
+            body = await request.json()
+        except (ValueError, UnicodeDecodeError):
+            return None
+        return body if isinstance(body, dict) else None
+
+    async def chat(request):
+        body = await read_json(request)
+        if body is None:
+            return _error(400, "Body must be a JSON object.")
+        user_id = str(body.get("user_id") or "").strip()
+        text = str(body.get("message") or "").strip()
+        if not user_id or not text:
+            return _error(400, "'user_id' and 'message' are required.")
+        if len(text) > MAX_MESSAGE_CHARS:
+            return _error(413, f"'message' is longer than {MAX_MESSAGE_CHARS} characters.")
+        model = body.get("model") or DEFAULT_MODEL
+        session = await service.sessions.get(user_id)
+
+        if body.get("stream"):
+            # Slot pehle hi check: bhari queue par 429 milna chahiye, aadhi SSE stream nahi
+            if service.llm_pool.full():
+                e = service.llm_pool.reject()
+                return _error(429, str(e), **{"Retry-After": str(e.retry_after)})
+            events = service.chat_stream(session, text, model)
+            return StreamingResponse(_guard_stream(events), media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache"})
+        try:
+            reply = await service.chat(session, text, model)
+        except Overloaded as e:
+            return _error(429, str(e), **{"Retry-After": str(e.retry_after)})
+        except UpstreamError as e:
+            return _error(502, f"Error while thinking: {e}")
+        return JSONResponse({"user_id": user_id, "reply": reply["content"], "lang": reply["lang"]})
+
+    async def ocr(request):
+        data = await request.body()
+        if not data:
+            return _error(400, "Send the image bytes as the request body.")
+        if len(data) > MAX_IMAGE_BYTES:
+            return _error(413, "Image is too large.")
+        try:
+            text = await service.ocr(data)
+        except Overloaded as e:
+            return _error(429, str(e), **{"Retry-After": str(e.retry_after)})
+        except ImportError as e:
+            return _error(503, f"OCR is not available on this server: {e}")
+        except ValueError as e:
+            return _error(400, str(e))
+        except Exception as e:
+            return _error(500, f"Error during OCR: {e}")
+        return JSONResponse({"text": text})
+
+    async def tts(request):
+        body = await read_json(request)
+        text = str((body or {}).get("text") or "").strip()
+        if not text:
+            return _error(400, "'text' is required.")
+        language = body.get("language") or await service.detect_language(text)
+        try:
+            audio = await service.tts(text, language, bool(body.get("slow")))
+        except Overloaded as e:
+            return _error(429, str(e), **{"Retry-After": str(e.retry_after)})
+        except Exception as e:
+            return _error(502, f"Error generating audio: {e}")
+        return Response(audio, media_type="audio/mpeg")
+
+    async def history(request):
+        user_id = request.path_params["user_id"]
+        if request.method == "DELETE":
+            async with (await service.sessions.get(user_id)).lock:
+                await service.run_blocking(memory_handler.clear_memory, user_id)
+                service.sessions.drop(user_id)
+            return JSONResponse({"user_id": user_id, "cleared": True})
+        try:
+            limit = int(request.query_params.get("limit", 50))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            # SQLite mein LIMIT -1 = poori history, isliye negative/zero yahin rok do
+            return _error(400, "'limit' must be a positive integer.")
+        limit = min(500, limit)
+        messages = await service.run_blocking(memory_handler.load_tail, user_id, limit) or []
+        return JSONResponse({"user_id": user_id, "messages": [
+            {k: m.get(k) for k in ("role", "content", "lang", "timestamp")} for m in messages
+        ]})
+
+    async def healthz(request):
+        return JSONResponse(service.health())
+
+    async def metrics(request):
+        return Response(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    app = Starlette(routes=[
+        Route("/v1/chat", chat, methods=["POST"]),
+        Route("/v1/ocr", ocr, methods=["POST"]),
+        Route("/v1/tts", tts, methods=["POST"]),
+        Route("/v1/users/{user_id}/history", history, methods=["GET", "DELETE"]),
+        Route("/healthz", healthz),
+        Route("/metrics", metrics),
+    ], lifespan=lifespan)
+    app.state.service = service
+    return app
+
+
+async def _guard_stream(events):
+    """Streaming ke dauraan 429/errors ko SSE error event bana deta hai (headers ja chuke hote hain)."""
+    try:
+        async for event in events:
+            yield event
+    except Overloaded as e:
+        yield _sse({"error": str(e), "status": 429, "retry_after": e.retry_after})
+    finally:
+        await events.aclose()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Rafiq headless API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
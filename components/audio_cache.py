@@ -0,0 +1,174 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from components.metrics import span
+
+# --- Cache settings ---
+AUDIO_CACHE_DIR = 'audio_cache'
+MEMORY_BUDGET_BYTES = 32 * 1024 * 1024   # in-process LRU
+DISK_BUDGET_BYTES = 256 * 1024 * 1024    # on-disk store
+
+
+def audio_key(text, language, slow=False):
+    """(text hash, language, speed) se ek stable cache key banata hai."""
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    speed = "slow" if slow else "normal"
+    return f"{digest}_{language}_{speed}"
+
+
+# --- Synthesis backends ---
+class GTTSEngine:
+    """Default backend: Google TTS via gTTS. Returns MP3 bytes."""
+
+    def synthesize(self, text, language, slow=False):
+        from gtts import gTTS
+
+        fp = io.BytesIO()
+        gTTS(text=text, lang=language, slow=slow).write_to_fp(fp)
+        return fp.getvalue()
+
+
+# --- 1. In-memory LRU (byte budget) ---
+class MemoryLRU:
+    def __init__(self, max_bytes=MEMORY_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._items[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+# --- 2. On-disk store (size-based eviction) ---
+class DiskStore:
+    def __init__(self, directory=AUDIO_CACHE_DIR, max_bytes=DISK_BUDGET_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mtime = last access, used for eviction order
+            return data
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Audio cache write error: {e}")
+            return
+        self.evict()
+
+    def evict(self):
+        """Oldest-accessed files delete karta hai jab tak total size budget ke andar na aa jaye."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.mp3'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+# --- 3. Two-tier cache (background pre-synthesis tts_pipeline.SpeechPipeline mein hai) ---
+class AudioCache:
+    def __init__(self, engine=None, memory=None, disk=None):
+        self.engine = engine or GTTSEngine()
+        self.memory = memory if memory is not None else MemoryLRU()
+        self.disk = disk if disk is not None else DiskStore()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        data = self.memory.get(key)
+        if data is None:
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.put(key, data)
+        return data
+
+    def store(self, key, data):
+        self.memory.put(key, data)
+        self.disk.put(key, data)
+
+    def get_audio(self, text, language="ar", slow=False):
+        """Cached MP3 bytes return karta hai; miss par synthesize karke dono tiers mein save."""
+        key = audio_key(text, language, slow)
+        data = self.lookup(key)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        # Same chunk ki parallel requests SpeechPipeline ke in-flight futures mein jud jaati hain
+        self.misses += 1
+        with span("tts_synthesis", lang=language) as s:
+            data = self.engine.synthesize(text, language, slow)
+            s.set(chars=len(text), audio_bytes=len(data))
+        self.store(key, data)
+        return data
+
+
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Process-wide AudioCache (pehli call par banta hai)."""
+    global _audio_cache
+    if _audio_cache is None:
+        with _audio_cache_lock:
+            if _audio_cache is None:
+                _audio_cache = AudioCache()
+    return _audio_cache
+
+
+def set_audio_engine(engine):
+    """Synthesis backend swap karta hai (e.g. offline stub engine for tests/benchmarks)."""
+    get_audio_cache().engine = engine
@@ -0,0 +1,314 @@
+"""
+Bulk mode: JSONL prompts ko get_ai_response se guzaar kar results JSONL mein likhta hai.
+
+    python -m components.batch_runner prompts.jsonl results.jsonl [--concurrency 8] [--rpm 60] [--tpm 150000]
+
+Input line:  {"id": "faq-1", "prompt": "...", "model": "openai/gpt-4o-mini", "user_id": "ghadeer"}
+             (sirf "prompt" zaroori; id na ho toh line number; model na ho toh --model)
+Output line: {"id", "model", "prompt", "reply", "status": "ok"|"error", "error", "latency_s", "usage", ...}
+
+Har result turant append hota hai (checkpoint). Dobara chalane par jo ids "ok" likhe ja chuke hain skip hote hain,
+toh beech mein ruka run wahin se continue karta hai.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from components.context_builder import count_tokens
+from components.core_logic import get_ai_response
+
+# --- Settings ---
+DEFAULT_MODEL = "openai/gpt-4o-mini"
+DEFAULT_CONCURRENCY = 8
+WINDOW = 1000                     # itni lines ek saath padh kar model ke hisaab se group hoti hain
+PROMPT_OVERHEAD_TOKENS = 400      # system prompt + references ka andaaza (TPM reservation ke liye)
+EXPECTED_COMPLETION_TOKENS = 300
+
+# USD per 1M tokens (input, output) - OpenRouter list prices, sirf estimate ke liye; --prices se override
+MODEL_PRICES = {
+    "openai/gpt-4o-mini": (0.15, 0.60),
+    "openai/gpt-4o": (2.50, 10.00),
+    "mistralai/mistral-7b-instruct-v0.2": (0.20, 0.20),
+    "anthropic/claude-3.5-sonnet": (3.00, 15.00),
+}
+
+
+# --- 1. Requests/tokens per minute limiter ---
+class RateLimiter:
+    """
+    Sliding 60s window: acquire(tokens) tab tak rukta hai jab tak request aur (estimated) tokens
+    dono limit mein na aa jayein. settle() asli usage aane par estimate ko theek karta hai.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = deque()          # [timestamp, tokens]
+        self._tokens = 0
+        self._cond = threading.Condition()
+
+    def _prune(self, now):
+        while self._events and now - self._events[0][0] >= self.WINDOW_SECONDS:
+            self._tokens -= self._events.popleft()[1]
+
+    def acquire(self, tokens=0):
+        if not self.rpm and not self.tpm:
+            return None
+        tokens = min(tokens, self.tpm) if self.tpm else tokens   # ek bada prompt hamesha ke liye na atke
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                rpm_ok = not self.rpm or len(self._events) < self.rpm
+                tpm_ok = not self.tpm or self._tokens + tokens <= self.tpm
+                if rpm_ok and tpm_ok:
+                    event = [now, tokens]
+                    self._events.append(event)
+                    self._tokens += tokens
+                    return event
+                wait_for = self.WINDOW_SECONDS - (now - self._events[0][0]) if self._events else 0.05
+                self._cond.wait(timeout=max(0.05, wait_for))
+
+    def settle(self, event, actual_tokens):
+        if event is None or actual_tokens is None:
+            return
+        with self._cond:
+            if any(e is event for e in self._events):
+                self._tokens += actual_tokens - event[1]
+                event[1] = actual_tokens
+            self._cond.notify_all()
+
+
+# --- 2. Input / checkpoint ---
+def read_prompts(path, default_model):
+    """JSONL se items lazily padhta hai. Kharab lines print hoti hain aur skip."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Line {line_no}: invalid JSON ({e}), skipped.")
+                continue
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict) or not str(item.get("prompt") or "").strip():
+                print(f"⚠️ Line {line_no}: no 'prompt', skipped.")
+                continue
+            item["id"] = str(item.get("id", line_no))
+            item["model"] = item.get("model") or default_model
+            yield item
+
+
+def load_checkpoint(path):
+    """Results file se woh ids jo pehle hi 'ok' ho chuke hain."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue   # crash ke waqt aadhi likhi line
+            if row.get("status") == "ok":
+                done.add(str(row.get("id")))
+    return done
+
+
+class ResultWriter:
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, row):
+        with self._lock:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# --- 3. Stats ---
+class BatchStats:
+    def __init__(self, prices):
+        self.prices = prices
+        self.started = time.perf_counter()
+        self.skipped = 0
+        self.per_model = defaultdict(lambda: {"ok": 0, "error": 0, "cache_hits": 0, "latencies": [],
+                                              "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0})
+        self._lock = threading.Lock()
+
+    def add(self, model, ok, stats):
+        usage = stats.get("usage") or {}
+        with self._lock:
+            m = self.per_model[model]
+            m["ok" if ok else "error"] += 1
+            m["cache_hits"] += 1 if stats.get("cache_hit") else 0
+            if stats.get("total") is not None:
+                m["latencies"].append(stats["total"])
+            for name in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                m[name] += usage.get(name) or 0
+
+    def cost(self, model, m):
+        price_in, price_out = self.prices.get(model, (0.0, 0.0))
+        return (m["prompt_tokens"] * price_in + m["completion_tokens"] * price_out) / 1_000_000
+
+    def report(self):
+        wall = time.perf_counter() - self.started
+        lines = [f"\n{'model':<36} {'ok':>6} {'err':>5} {'p50 s':>7} {'p95 s':>7} {'in tok':>9} "
+                 f"{'out tok':>9} {'cached':>8} {'cost $':>9}"]
+        totals = {"ok": 0, "error": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0}
+        for model, m in sorted(self.per_model.items()):
+            latencies = sorted(m["latencies"]) or [0.0]
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            cost = self.cost(model, m)
+            lines.append(f"{model:<36} {m['ok']:>6} {m['error']:>5} {p50:>7.2f} {p95:>7.2f} "
+                         f"{m['prompt_tokens']:>9} {m['completion_tokens']:>9} {m['cached_tokens']:>8} {cost:>9.4f}")
+            for name in ("ok", "error", "prompt_tokens", "completion_tokens"):
+                totals[name] += m[name]
+            totals["cost"] += cost
+        done = totals["ok"] + totals["error"]
+        tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+        lines.append(
+            f"\n✅ {totals['ok']} ok, ❌ {totals['error']} failed, ⏭️ {self.skipped} skipped (already done) "
+            f"in {wall:.1f}s - {done / wall if wall else 0:.2f} req/s, {tokens / wall if wall else 0:.0f} tok/s, "
+            f"est. cost ${totals['cost']:.4f}"
+        )
+        return "\n".join(lines)
+
+
+# --- 4. Runner ---
+def _is_error_reply(reply, stats):
+    # get_ai_response errors raise nahi karta, string return karta hai
+    return bool(stats.get("error")) or not reply
+
+
+def run_item(item, limiter, use_cache):
+    estimate = count_tokens(item["prompt"]) + PROMPT_OVERHEAD_TOKENS + EXPECTED_COMPLETION_TOKENS
+    reservation = limiter.acquire(estimate)
+    stats = {}
+    messages = [{"role": "user", "content": item["prompt"]}]
+    reply = get_ai_response(messages, model=item["model"], user_id=item.get("user_id"),
+                            use_cache=use_cache, stats=stats)
+    usage = stats.get("usage") or {}
+    if stats.get("cache_hit"):
+        limiter.settle(reservation, 0)   # upstream tak gaya hi nahi
+    elif usage:
+        limiter.settle(reservation, (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0))
+    ok = not _is_error_reply(reply, stats)
+    row = {
+        "id": item["id"],
+        "model": stats.get("model") or item["model"],
+        "requested_model": item["model"],
+        "prompt": item["prompt"],
+        "reply": reply if ok else None,
+        "status": "ok" if ok else "error",
+        "error": None if ok else (stats.get("error") or reply),
+        "latency_s": round(stats["total"], 3) if stats.get("total") is not None else None,
+        "cache_hit": stats.get("cache_hit", False),
+        "usage": usage,
+    }
+    # Input ke extra fields (tags, category...) result ke saath wapas
+    row.update({k: v for k, v in item.items() if k not in row and k != "user_id"})
+    return row, stats
+
+
+def run_batch(input_path, output_path, model=DEFAULT_MODEL, concurrency=DEFAULT_CONCURRENCY, rpm=None, tpm=None,
+              use_cache=None, prices=None, window=WINDOW, limit=None):
+    """Returns BatchStats. Rate limits har model ke liye alag (providers per-model limit lagate hain)."""
+    done = load_checkpoint(output_path)
+    stats = BatchStats(prices or MODEL_PRICES)
+    limiters = defaultdict(lambda: RateLimiter(rpm, tpm))
+    writer = ResultWriter(output_path)
+    items = read_prompts(input_path, model)
+    if limit:
+        items = islice(items, limit)
+
+    def task(item):
+        row, call_stats = run_item(item, limiters[item["model"]], use_cache)
+        writer.write(row)
+        stats.add(row["requested_model"], row["status"] == "ok", call_stats)
+        return row
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    try:
+        while True:
+            chunk = list(islice(items, window))
+            if not chunk:
+                break
+            groups = defaultdict(list)
+            for item in chunk:
+                if item["id"] in done:
+                    stats.skipped += 1
+                    continue
+                done.add(item["id"])     # same id do baar input mein ho toh ek hi baar chale
+                groups[item["model"]].append(item)
+            # Ek model ka kaam saath mein: uska rate limit aur provider prompt cache dono behtar
+            pending = set()
+            for group_model in sorted(groups):
+                for item in groups[group_model]:
+                    if len(pending) >= concurrency * 2:
+                        _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        _report_progress(stats)
+                    pending.add(pool.submit(task, item))
+            for future in pending:
+                future.result()
+            _report_progress(stats)
+    finally:
+        # Ctrl+C par queued items cancel; jo chal rahe hain woh poore hokar checkpoint mein likhe jaate hain
+        pool.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+    return stats
+
+
+def _report_progress(stats):
+    total = sum(m["ok"] + m["error"] for m in stats.per_model.values())
+    if total:
+        sys.stdout.write(f"\r⏳ {total} done")
+        sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through Rafiq (resumable).")
+    parser.add_argument("input", help="prompts JSONL")
+    parser.add_argument("output", help="results JSONL (append + resume)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="model for lines without a 'model' field")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rpm", type=int, help="max requests per minute (per model)")
+    parser.add_argument("--tpm", type=int, help="max tokens per minute (per model)")
+    parser.add_argument("--cache", dest="use_cache", action="store_true", default=None,
+                        help="use the response cache (default: RAFIQ_RESPONSE_CACHE)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false")
+    parser.add_argument("--prices", help='JSON file: {"model": [usd_per_1m_input, usd_per_1m_output]}')
+    parser.add_argument("--limit", type=int, help="sirf pehli N lines")
+    args = parser.parse_args()
+
+    prices = dict(MODEL_PRICES)
+    if args.prices:
+        with open(args.prices, encoding="utf-8") as f:
+            prices.update({k: tuple(v) for k, v in json.load(f).items()})
+
+    try:
+        stats = run_batch(args.input, args.output, model=args.model, concurrency=args.concurrency,
+                          rpm=args.rpm, tpm=args.tpm, use_cache=args.use_cache, prices=prices, limit=args.limit)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted - run the same command again to resume.")
+        sys.exit(130)
+    print(stats.report())
+
+
+if __name__ == '__main__':
+    main()
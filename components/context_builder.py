@@ -0,0 +1,238 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from components import memory_handler
+
+# --- Token budgets (history side, per model) ---
+# Budget sirf conversation history (summary + segment + volatile note) ka hai. Static prefix (persona,
+# rules, profile, duas) alag hai aur budget nahi khata: woh har call par same bytes hai (provider cache
+# mein), aur use ghatane par bada duas block history ko zero kar deta tha -> har turn summarizer.
+# Provider cache sirf >=1024-token prefix par lagta hai: ~380 ka prefix + 1600 ka segment (jump ke baad
+# aadha) zyada tar turns par us limit ke upar rehta hai. bench_prompt_cache (40 turns): 66% prompt tokens
+# cached, TTFT p50 legacy ka ~aadha; input cost legacy se ~16% zyada (zyada context + summarizer calls,
+# gpt-4o-mini par cached = aadhi keemat). Mistral par caching nahi, isliye chhota budget.
+DEFAULT_TOKEN_BUDGET = 1000
+MODEL_TOKEN_BUDGETS = {
+    "openai/gpt-4o-mini": 1600,
+    "openai/gpt-4o": 1600,
+    "mistralai/mistral-7b-instruct-v0.2": 800,
+    "anthropic/claude-3.5-sonnet": 1600,
+}
+MESSAGE_OVERHEAD_TOKENS = 4   # role + separators per chat message
+LATEST_MESSAGE_TOKENS = 3000  # latest message isse lamba ho tabhi truncate
+SEGMENT_RETAIN = 0.5          # segment budget se bahar jaye toh itna hissa (newest) rakh kar baaki summary mein
+MIN_FOLD_MESSAGES = 4         # ek fold mein kam se kam do poore turns: summarizer lagaatar turns par nahi chalta
+SUMMARY_MAX_CHARS = 2000
+
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()   # API server ke threads bhi count_tokens chalate hain
+TOKEN_CACHE_SIZE = 8192
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+# Process-only summaries: callers without a user_id, ya jinki history stored summary se match nahi karti
+_local_summaries = {}
+
+
+def get_token_budget(model):
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+
+# --- Token counting ---
+def _get_encoding():
+    """tiktoken optional hai; na ho toh character-based estimate use hota hai."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def _estimate_tokens(text):
+    # Latin text ~4 chars/token; Arabic/Devanagari tokenizers mein ~2 chars/token
+    non_ascii = sum(1 for ch in text if ord(ch) > 0x7F)
+    ascii_chars = len(text) - non_ascii
+    return ascii_chars // 4 + non_ascii // 2 + 1
+
+
+def count_tokens(text):
+    """Text ke tokens count karta hai; result content hash par cache hota hai."""
+    if not text:
+        return 0
+    key = hashlib.sha1(text.encode("utf-8")).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+        if cached is not None:
+            _token_cache.move_to_end(key)
+            return cached
+
+    encoding = _get_encoding()
+    tokens = len(encoding.encode(text)) if encoding is not None else _estimate_tokens(text)
+
+    with _token_cache_lock:
+        _token_cache[key] = tokens
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return tokens
+
+
+def message_tokens(message):
+    """Message dict par "tokens" store karta hai taaki har turn dobara count na ho."""
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+        message["tokens"] = tokens
+    return tokens
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Bahut lambe message (e.g. OCR paste) ka shuru aur aakhri hissa rakhta hai."""
+    total = count_tokens(text)
+    if total <= max_tokens or max_tokens <= 0:
+        return text if max_tokens > 0 else ""
+    keep_chars = max(1, int(len(text) * max_tokens / total))
+    head = text[: keep_chars * 2 // 3]
+    tail = text[len(text) - keep_chars // 3:]
+    return f"{head}\n…[truncated]…\n{tail}"
+
+
+# --- Rolling summary ---
+def _anchor(message):
+    return hashlib.sha1(message.get("content", "").encode("utf-8")).hexdigest()
+
+
+def _match_summary(row, messages_history):
+    """Summary row ki boundary is history mein dhoondhta hai. Returns (summary, covered) ya None."""
+    summary, covered, anchor = row
+    if not covered:
+        return summary, 0
+    if covered <= len(messages_history) and _anchor(messages_history[covered - 1]) == anchor:
+        return summary, covered
+    # History list DB ki poori history nahi bhi ho sakti (e.g. API session sirf tail load karta hai):
+    # anchor message ko dhoondh kar boundary wahan set karo
+    for index in range(len(messages_history) - 1, -1, -1):
+        if _anchor(messages_history[index]) == anchor:
+            return summary, index + 1
+    return None
+
+
+def _load_summary(user_id, messages_history):
+    """
+    Returns (summary, covered, persist). Stored summary ka anchor is history mein na mile (naya app
+    session, chat clear, batch ka one-off prompt) toh woh is conversation ki nahi: use chhote bina
+    overwrite, is conversation ki summary sirf process mein rehti hai (persist False).
+    """
+    row = memory_handler.load_summary(user_id) if user_id is not None else None
+    if row:
+        matched = _match_summary(row, messages_history)
+        if matched is not None:
+            return matched[0], matched[1], True
+    persist = user_id is not None and not row
+    local = _local_summaries.get(user_id)
+    if local:
+        matched = _match_summary(local, messages_history)
+        if matched is not None:
+            return matched[0], matched[1], persist
+    return "", 0, persist
+
+
+def _save_summary(user_id, summary, covered, messages_history, persist):
+    anchor = _anchor(messages_history[covered - 1]) if covered else None
+    if persist:
+        memory_handler.save_summary(user_id, summary, covered, anchor)
+    else:
+        _local_summaries[user_id] = (summary, covered, anchor)
+
+
+# --- Context assembly ---
+def _segment_start(messages_history, covered, keep_tokens):
+    """covered ke baad newest-first itne messages jo keep_tokens mein aayein; kam se kam aakhri message."""
+    start = len(messages_history)
+    used = 0
+    for index in range(len(messages_history) - 1, covered - 1, -1):
+        tokens = message_tokens(messages_history[index])
+        if used + tokens > keep_tokens and start < len(messages_history):
+            break
+        used += tokens
+        start = index
+    return start
+
+
+def build_context(messages_history, model, system_prompt, user_id=None, summarizer=None, budget=None,
+                  reserve_tokens=0):
+    """
+    History ko append-only segment ki tarah bhejta hai: segment ka shuru (summary boundary) tab tak
+    nahi hilta jab tak woh token budget ke andar hai, taaki har call ka prompt prefix pichle call jaisa
+    rahe (provider prompt caching). Budget se bahar jaane par segment ek jhatke mein aage badhta hai:
+    newest SEGMENT_RETAIN hissa rehta hai, baaki `summarizer(previous_summary, messages)` se rolling
+    summary mein fold hota hai (per user persisted; stored summary is history ki na ho toh process-only).
+    system_prompt (static prefix) budget se bahar hai; budget sirf summary + history ka.
+    reserve_tokens: baad mein judne wale volatile hisse (language hint, references) ke liye jagah.
+    Returns (messages_for_api, info dict).
+    """
+    budget = budget or get_token_budget(model)
+    available = budget - reserve_tokens
+
+    summary, covered, persist = _load_summary(user_id, messages_history)
+
+    def history_room():
+        return available - (count_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0)
+
+    segment_tokens = sum(message_tokens(m) for m in messages_history[covered:])
+    start = covered
+    if segment_tokens > history_room():
+        start = _segment_start(messages_history, covered, int(history_room() * SEGMENT_RETAIN))
+    # Chhota fold (e.g. pichle turn ke jump ke baad) nahi hota: tab tak newest-first selection budget sambhalta hai
+    if start - covered >= MIN_FOLD_MESSAGES:
+        if summarizer is not None:
+            try:
+                new_summary = summarizer(summary, messages_history[covered:start])
+            except Exception as e:
+                print(f"Summary update failed: {e}")
+                new_summary = None
+            if new_summary:
+                summary = new_summary.strip()[:SUMMARY_MAX_CHARS]
+        # Summary fail ho tab bhi boundary aage: warna har turn par jump (aur prefix change) hota
+        covered = start
+        _save_summary(user_id, summary, covered, messages_history, persist)
+
+    # Segment (normally poora); agar summary ke baad bhi bada ho toh newest-first, latest hamesha (truncate karke)
+    remaining = history_room()
+    selected = []
+    for index in range(len(messages_history) - 1, covered - 1, -1):
+        message = messages_history[index]
+        tokens = message_tokens(message)
+        if tokens > remaining:
+            if not selected:
+                # Latest message (e.g. OCR paste) history budget se nahi, apni alag limit se katta hai
+                room = max(remaining, LATEST_MESSAGE_TOKENS)
+                content = truncate_to_tokens(message["content"], room - MESSAGE_OVERHEAD_TOKENS)
+                selected.append({"role": message["role"], "content": content})
+            break
+        selected.append({"role": message["role"], "content": message["content"]})
+        remaining -= tokens
+    selected.reverse()
+
+    messages_for_api = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages_for_api.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation (for context only):\n{summary}",
+        })
+    messages_for_api.extend(selected)
+
+    info = {
+        "budget": budget,
+        "history_messages": len(selected),
+        "summarized_messages": covered,
+        "prompt_tokens": sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages_for_api),
+    }
+    return messages_for_api, info
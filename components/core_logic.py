@@ -1,32 +1,37 @@
 import os
 import json
-import langid
-from openai import OpenAI
-from dotenv import load_dotenv
-from components.lang_handler import detect_language
-
-# --- Load environment variables ---
-load_dotenv()
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-
-# --- Initialize OpenAI Client (via OpenRouter) ---
-def initialize_openai_client():
-    if not OPENROUTER_API_KEY:
-        print("❌ Error: OPENROUTER_API_KEY not found in .env file.")
-        return None
-    try:
-        return OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,
-        )
-    except Exception as e:
-        print(f"⚠️ Error initializing OpenAI client: {e}")
-        return None
+import time
+import threading
+from functools import lru_cache
+from components.lang_handler import detect_language, warm_up_language_model
+from components.context_builder import build_context, count_tokens
+from components.prompt_builder import (apply_cache_breakpoints, attach_volatile_context, static_prefix,
+                                       volatile_context)
+from components.retrieval import retrieve_snippets
+from components.response_cache import cache_enabled, cache_key, get_response_cache
+from components.metrics import record, span
+
 
+# --- Shared LLM gateway (pooled client, retries, model fallback) ---
+def get_llm_gateway():
+    """openai SDK (~1s import) pehli zaroorat par load hota hai; gateway process-wide singleton hai."""
+    from components.llm_gateway import get_gateway
+    return get_gateway()
+
+
+def prewarm_in_background():
+    """Gateway + langid background thread mein load karta hai taaki pehla reply cold import na bhare."""
+    def _warm():
+        get_llm_gateway()
+        warm_up_language_model()
+
+    thread = threading.Thread(target=_warm, name="rafiq-prewarm", daemon=True)
+    thread.start()
+    return thread
 
-client = initialize_openai_client()
 
 # --- Load Ghadeer Profile ---
+@lru_cache(maxsize=1)
 def load_ghadeer_profile():
     try:
         data_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'ghadeer_profile.json')
@@ -36,7 +41,11 @@ def load_ghadeer_profile():
         print("⚠️ Error: ghadeer_profile.json not found.")
         return {}
 
-GHADEER_PROFILE = load_ghadeer_profile()
+def __getattr__(name):
+    # GHADEER_PROFILE pehle module-level constant tha; ab pehli access par load (aur cache) hota hai
+    if name == "GHADEER_PROFILE":
+        return load_ghadeer_profile()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Smart Language Detector ---
 def get_language_name(code):
@@ -50,56 +59,234 @@ def get_language_name(code):
     return mapping.get(code, code.capitalize())
 
 
-# --- Build System Prompt ---
-def create_system_prompt(input_language="en"):
-    creator = "Mohammad"
-    user = "Ghadeer Mahmoud"
-    language_name = get_language_name(input_language)
-
-    system_message = (
-        f"You are **Rafiq (رفيق)** — a friendly and emotionally intelligent AI assistant created by {creator} "
-        f"for {user}. You must always reply **in the same language** as the user's message "
-        f"(detected: {language_name}).\n\n"
-        f"✨ Rules:\n"
-        f"- Reply strictly in the user's input language.\n"
-        f"- Never translate or mix languages.\n"
-        f"- Be warm, natural, and human-like.\n"
-        f"- Keep responses short, meaningful, and emotionally engaging.\n"
-        f"- If user greets or chats casually, respond like a close supportive friend.\n"
-        f"- If user asks questions, answer with helpful clarity.\n"
-    )
-
-    return system_message
+# --- Rolling Summary of Older Turns ---
+SUMMARY_MODEL = "openai/gpt-4o-mini"
 
+def summarize_turns(previous_summary, messages):
+    """Purani summary + naye gire hue turns ko ek chhoti summary mein fold karta hai."""
+    gateway = get_llm_gateway()
+    if gateway is None:
+        return None
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    with span("summary", model=SUMMARY_MODEL) as s:
+        _, completion = gateway.chat(
+            model=SUMMARY_MODEL,
+            deadline=15.0,
+            messages=[
+                {"role": "system", "content": (
+                    "Update the running summary of a conversation between Rafiq and the user. "
+                    "Keep names, facts, feelings, plans and open questions. "
+                    "Write at most 150 words, in the language the user mostly uses."
+                )},
+                {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            temperature=0.2,
+            max_tokens=300
+        )
+        s.set(**usage_fields(completion.usage))
+    return completion.choices[0].message.content
 
-# --- Generate AI Response ---
-def get_ai_response(messages_history, model=None):
-    if client is None:
-        return "❌ Connection to OpenRouter failed. Please check your API key."
 
-    # Detect language of last message
+# --- Prepare API Messages ---
+def build_messages_for_api(messages_history, model=None, user_id=None):
+    """
+    Stable prefix + append-only history segment (+ rolling summary) + volatile note,
+    shared by the blocking and streaming calls.
+    """
+    # Language of last message (already stored on the dict when it was appended)
     try:
-        last_user_msg = messages_history[-1]["content"]
-        lang_code = langid.classify(last_user_msg)[0]
+        last_msg = messages_history[-1]
+        lang_code = last_msg.get("lang") or detect_language(last_msg["content"])[0]
     except Exception:
         lang_code = "en"
 
-    system_prompt = create_system_prompt(lang_code)
-    selected_model = model or "openai/gpt-4o-mini"
+    with span("retrieval") as s:
+        references = retrieve_snippets(
+            messages_history[-1]["content"] if messages_history else "",
+            user_id=user_id,
+            exclude_texts=[m["content"] for m in messages_history[-10:]],
+        )
+        s.set(snippets=len(references))
+    with span("system_prompt", lang=lang_code):
+        # Stable prefix (persona, rules, profile) pehle; language hint + references aakhri message ke saath
+        system_prompt = static_prefix(load_ghadeer_profile())
+        note = volatile_context(get_language_name(lang_code), references)
+
+    with span("context_build", model=model or "openai/gpt-4o-mini") as s:
+        messages_for_api, info = build_context(
+            messages_history,
+            model or "openai/gpt-4o-mini",
+            system_prompt,
+            user_id=user_id,
+            summarizer=summarize_turns,
+            reserve_tokens=count_tokens(note),
+        )
+        messages_for_api = attach_volatile_context(messages_for_api, note)
+        s.set(prompt_tokens_estimate=info["prompt_tokens"], history_messages=info["history_messages"])
+    return messages_for_api
+
+
+def usage_fields(usage):
+    """API `usage` object se token counts (cached prompt tokens bhi, jahan provider de)."""
+    if usage is None:
+        return {}
+    fields = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+    }
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is not None and getattr(details, "cached_tokens", None) is not None:
+        fields["cached_tokens"] = details.cached_tokens
+    return {k: v for k, v in fields.items() if v is not None}
+
+
+def _payload_bytes(messages):
+    return sum(len(m["content"].encode("utf-8")) for m in messages)
+
+
+# --- Generate AI Response ---
+CHAT_TEMPERATURE = 0.7
+
+def get_ai_response(messages_history, model=None, user_id=None, use_cache=None, stats=None):
+    """
+    use_cache: True/False per-request override of the opt-in response cache (None = global setting).
+    If a `stats` dict is passed it is filled with the model actually used, total latency,
+    token usage, cache hit and error (batch runner inke saath rate limit / cost ginta hai).
+    """
+    if stats is None:
+        stats = {}
+    stats.update({"model": model or "openai/gpt-4o-mini", "total": None, "cache_hit": False,
+                  "error": None, "usage": None})
+
+    gateway = get_llm_gateway()
+    if gateway is None:
+        stats["error"] = "no_api_key"
+        return "❌ Connection to OpenRouter failed. Please check your API key."
+
+    selected_model = stats["model"]
 
     # Prepare messages for API
-    messages_for_api = [{"role": "system", "content": system_prompt}]
-    messages_for_api.extend(messages_history[-10:])
+    messages_for_api = build_messages_for_api(messages_history, selected_model, user_id)
+    start = time.perf_counter()
+
+    key = None
+    if cache_enabled(use_cache):
+        key = cache_key(selected_model, messages_for_api, CHAT_TEMPERATURE)
+        cached = get_response_cache().get(key)
+        if cached is not None:
+            stats.update({"cache_hit": True, "total": time.perf_counter() - start})
+            return cached
 
     try:
-        completion = client.chat.completions.create(
-            model=selected_model,
-            messages=messages_for_api,
-            temperature=0.7
-        )
+        lang_code = messages_history[-1].get("lang") if messages_history else None
+        with span("llm", model=selected_model, lang=lang_code) as s:
+            used_model, completion = gateway.chat(
+                model=selected_model,
+                messages=apply_cache_breakpoints(messages_for_api, selected_model),
+                temperature=CHAT_TEMPERATURE
+            )
+            stats["model"] = used_model
+            stats["usage"] = usage_fields(completion.usage)
+            s.tag(model=used_model)
+            s.set(request_bytes=_payload_bytes(messages_for_api), **stats["usage"])
 
         response_text = completion.choices[0].message.content.strip()
+        stats["total"] = time.perf_counter() - start
+        # Fallback model ka jawab primary model ki key ke neeche cache nahi hota
+        if key is not None and response_text and used_model == selected_model:
+            get_response_cache().put(key, response_text, model=used_model, latency=stats["total"])
         return response_text
 
     except Exception as e:
+        stats["error"] = str(e)
+        stats["total"] = time.perf_counter() - start
         return f"⚠️ Error while thinking: {str(e)}"
+
+
+# --- Stream AI Response ---
+def stream_ai_response(messages_history, model=None, stats=None, user_id=None, use_cache=None):
+    """
+    Generator version of get_ai_response: yields text deltas as they arrive.
+    If a `stats` dict is passed it is filled with time-to-first-token ("ttft"),
+    total latency ("total"), chunk count, cache hit and whether the stream was cancelled.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({"model": model or "openai/gpt-4o-mini", "ttft": None, "total": None,
+                  "chunks": 0, "cancelled": False, "error": None, "cache_hit": False, "usage": None})
+
+    gateway = get_llm_gateway()
+    if gateway is None:
+        stats["error"] = "no_api_key"
+        yield "❌ Connection to OpenRouter failed. Please check your API key."
+        return
+
+    requested_model = stats["model"]
+    messages_for_api = build_messages_for_api(messages_history, requested_model, user_id)
+    start = time.perf_counter()
+
+    key = None
+    if cache_enabled(use_cache):
+        key = cache_key(stats["model"], messages_for_api, CHAT_TEMPERATURE)
+        cached = get_response_cache().get(key)
+        if cached is not None:
+            stats.update({"cache_hit": True, "chunks": 1,
+                          "ttft": time.perf_counter() - start, "total": time.perf_counter() - start})
+            yield cached
+            return
+
+    stream = None
+    parts = []
+
+    try:
+        # Retries / fallback sirf pehle token se pehle; stats["model"] = jo model actually chala
+        stats["model"], stream = gateway.open_stream(
+            model=stats["model"],
+            messages=apply_cache_breakpoints(messages_for_api, stats["model"]),
+            temperature=CHAT_TEMPERATURE,
+            stream_options={"include_usage": True}
+        )
+
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                stats["usage"] = usage_fields(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if stats["ttft"] is None:
+                stats["ttft"] = time.perf_counter() - start
+            stats["chunks"] += 1
+            parts.append(delta)
+            yield delta
+
+    except GeneratorExit:
+        # Consumer stopped reading (e.g. Streamlit rerun) - stop the upstream request too
+        stats["cancelled"] = True
+        raise
+    except Exception as e:
+        stats["error"] = str(e)
+        # Partial text is already on screen, so append the error instead of replacing it
+        prefix = "\n\n" if stats["chunks"] else ""
+        yield f"{prefix}⚠️ Error while thinking: {str(e)}"
+    finally:
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        stats["total"] = time.perf_counter() - start
+        if stream is not None and not stats["cancelled"]:
+            # SLO stats mein TTFT jata hai; lamba magar healthy jawab primary model ko peeche nahi bhejta
+            gateway.record_stream_latency(stats["model"], stats["ttft"] if stats["ttft"] is not None else stats["total"],
+                                          ok=stats["error"] is None)
+            lang_code = messages_history[-1].get("lang") if messages_history else None
+            if stats["ttft"] is not None:
+                record("llm_ttft", stats["ttft"], model=stats["model"], lang=lang_code)
+            fields = dict(stats.get("usage") or {}, request_bytes=_payload_bytes(messages_for_api))
+            record("llm_stream", stats["total"], fields, model=stats["model"], lang=lang_code,
+                   status="error" if stats["error"] else None)
+            # Sirf poora, error-free jawab, aur sirf jab requested model ne hi diya ho (fallback nahi)
+            if key is not None and stats["error"] is None and parts and stats["model"] == requested_model:
+                get_response_cache().put(key, "".join(parts).strip(), model=stats["model"], latency=stats["total"])
@@ -1,41 +1,21 @@
 import streamlit as st
 from PIL import Image
 import pytesseract
-import os
+import io
 import base64
-from openai import OpenAI # <--- Yahan bhi fix
-from dotenv import load_dotenv
-
-# API Key load karna
-load_dotenv()
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-
-# OpenRouter Client initialize karna
-try:
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=OPENROUTER_API_KEY,
-    )
-except Exception as e:
-    # st.error(f"Error initializing OpenAI client: {e}") # Streamlit error se bachne ke liye print use karein
-    client = None
-
-# --- Helper Function: Image ko Base64 mein Encode karna ---
-def encode_image_to_base64(image_path):
-    """Image file path ko Base64 string mein badalta hai."""
-    try:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-    except Exception as e:
-        # st.error(f"Error encoding image: {e}")
-        return None
+import hashlib
+import threading
+from collections import OrderedDict
+from components.llm_gateway import get_gateway
+from components.metrics import span
+from components.ocr_pipeline import ocr_image_bytes, read_image_bytes
 
 # --- 1. OCR (Text Extraction) Function ---
 def perform_ocr(image_file):
+    """image_file: bytes, path ya uploaded file. Preprocessing + caching ocr_pipeline mein hai."""
     st.info("Performing OCR (Optical Character Recognition)...")
     try:
-        img = Image.open(image_file)
-        extracted_text = pytesseract.image_to_string(img, lang='ara+eng')
+        extracted_text = ocr_image_bytes(read_image_bytes(image_file))
         
         if extracted_text.strip():
             return extracted_text.strip()
@@ -49,15 +29,120 @@ def perform_ocr(image_file):
         st.error(f"An error occurred during OCR: {e}")
         return None
 
-# --- 2. Vision API (Description & Analysis) Function ---
-def analyze_image_with_vision(image_path, question):
-    if client is None:
+# --- 2. Vision Image Preparation (resize + re-encode + cache) ---
+VISION_MODEL = "openai/gpt-4o"
+VISION_FALLBACK_MODELS = ["anthropic/claude-3.5-sonnet"]   # sirf image samajhne wale models
+# gpt-4o high detail: image 2048x2048 mein fit hoti hai, phir shortest side 768 - isse bada bhejna waste hai
+VISION_MAX_LONG_SIDE = 2048
+VISION_MAX_SHORT_SIDE = 768
+VISION_FORMAT = "JPEG"        # ya "WEBP"
+VISION_QUALITY = 85
+VISION_CACHE_SIZE = 64
+PIL_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+_prepared_cache = OrderedDict()   # sha256(bytes) -> (mime, base64, stats)
+_answer_cache = OrderedDict()     # (sha256(bytes), question, model) -> answer
+_cache_lock = threading.Lock()    # Streamlit sessions alag threads mein chalte hain
+
+
+def _cache_get(cache, key):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache, key, value):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > VISION_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def prepare_image_for_vision(data):
+    """
+    Image bytes ko model ki effective resolution tak chhota karke VISION_FORMAT mein encode karta hai.
+    Returns (mime_type, base64_string, stats) - stats mein original/sent bytes aur content hash.
+    """
+    key = hashlib.sha256(data).hexdigest()
+    cached = _cache_get(_prepared_cache, key)
+    if cached is not None:
+        return cached
+
+    with span("vision_prepare") as s:
+        result = _prepare(data, key)
+        stats = result[2]
+        s.set(original_bytes=stats["original_bytes"], sent_bytes=stats["sent_bytes"],
+              bytes_saved=stats["bytes_saved"])
+    _cache_put(_prepared_cache, key, result)
+    return result
+
+
+def _prepare(data, key):
+    image = Image.open(io.BytesIO(data))
+    original_format = image.format
+
+    width, height = image.size
+    scale = min(1.0,
+                VISION_MAX_LONG_SIDE / max(width, height),
+                VISION_MAX_SHORT_SIDE / min(width, height))
+    if scale < 1.0:
+        image = image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+
+    if image.mode in ("RGBA", "LA", "P"):
+        # JPEG mein alpha nahi hota - white background par flatten
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    out = io.BytesIO()
+    image.save(out, format=VISION_FORMAT, quality=VISION_QUALITY)
+    encoded = out.getvalue()
+    mime = PIL_MIME_TYPES[VISION_FORMAT]
+
+    # Re-encode se file badi ho gayi (already small JPEG) toh original hi bhejo, sahi MIME ke saath
+    if scale == 1.0 and len(encoded) >= len(data) and original_format in PIL_MIME_TYPES:
+        encoded, mime = data, PIL_MIME_TYPES[original_format]
+
+    stats = {
+        "original_bytes": len(data),
+        "sent_bytes": len(encoded),
+        "bytes_saved": len(data) - len(encoded),
+        "size": image.size,
+        "sha256": key,
+    }
+    return mime, base64.b64encode(encoded).decode('utf-8'), stats
+
+
+# --- 3. Vision API (Description & Analysis) Function ---
+def analyze_image_with_vision(image_path, question, stats=None):
+    """image_path: path, bytes ya uploaded file. `stats` dict mein bytes saved / cache hit fill hota hai."""
+    if stats is None:
+        stats = {}
+    # Shared LLM gateway (core_logic ke saath same pooled client)
+    gateway = get_gateway()
+    if gateway is None:
         return "Vision API is unavailable due to an API client error."
-        
-    base64_image = encode_image_to_base64(image_path)
-    if not base64_image:
+
+    try:
+        mime_type, base64_image, prep_stats = prepare_image_for_vision(read_image_bytes(image_path))
+    except Exception as e:
+        print(f"Vision image preparation error: {e}")
         return "Could not process image for Vision API."
-        
+    stats.update(prep_stats)
+
+    # Exact bytes par key: 64-bit dHash text screenshots par collide karta tha (alag image, same hash)
+    answer_key = (prep_stats["sha256"], " ".join(question.split()).lower(), VISION_MODEL)
+    cached_answer = _cache_get(_answer_cache, answer_key)
+    stats["cache_hit"] = cached_answer is not None
+    if cached_answer is not None:
+        return cached_answer
+
     st.info("Analyzing image with Rafiq's Vision System...")
     
     vision_prompt = (
@@ -66,25 +151,34 @@ def analyze_image_with_vision(image_path, question):
     )
 
     try:
-        response = client.chat.completions.create(
-            model="openai/gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": vision_prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+        with span("vision", model=VISION_MODEL) as s:
+            s.set(request_bytes=prep_stats["sent_bytes"], bytes_saved=prep_stats["bytes_saved"])
+            used_model, response = gateway.chat(
+                model=VISION_MODEL,
+                fallback_models=VISION_FALLBACK_MODELS,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": vision_prompt},
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:{mime_type};base64,{base64_image}"
+                                },
                             },
-                        },
-                    ],
-                }
-            ],
-            max_tokens=500
-        )
-        return response.choices[0].message.content
+                        ],
+                    }
+                ],
+                max_tokens=500
+            )
+            s.tag(model=used_model)
+        stats["model"] = used_model
+        answer = response.choices[0].message.content
+        # Fallback model ka jawab VISION_MODEL ki key ke neeche cache nahi hota
+        if answer and used_model == VISION_MODEL:
+            _cache_put(_answer_cache, answer_key, answer)
+        return answer
         
     except Exception as e:
-        return f"An error occurred during Vision Analysis: {e}"
\ No newline at end of file
+        return f"An error occurred during Vision Analysis: {e}"
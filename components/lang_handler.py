@@ -1,25 +1,162 @@
-import langid
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from components.metrics import record
+
+LANG_NAMES = {
+    "ar": "Arabic",
+    "en": "English",
+    "hi": "Hindi",
+    "es": "Spanish",
+    "fr": "French",
+    "tr": "Turkish",
+    "de": "German",
+}
+
+# --- Fast Script Pre-Classifier ---
+# Clear single-script text ka faisla bina langid ke ho jata hai.
+SCRIPT_THRESHOLD = 0.9
+MIN_SCRIPT_LETTERS = 2
+ENGLISH_HINT_WORDS = {
+    "the", "is", "are", "you", "i", "me", "my", "how", "what", "why", "and",
+    "to", "a", "of", "it", "this", "that", "do", "can", "please", "thanks",
+    "thank", "hello", "hi", "hey", "good", "make", "help", "your",
+}
+
+
+def _script_of(char):
+    code = ord(char)
+    if (0x0600 <= code <= 0x06FF or 0x0750 <= code <= 0x077F
+            or 0x08A0 <= code <= 0x08FF or 0xFB50 <= code <= 0xFDFF
+            or 0xFE70 <= code <= 0xFEFF):
+        return "arabic"
+    if 0x0900 <= code <= 0x097F:
+        return "devanagari"
+    if code < 0x80 or 0x00C0 <= code <= 0x024F:
+        return "latin"
+    return "other"
+
+
+def classify_by_script(text):
+    """
+    Unicode script dekh kar language decide karta hai.
+    Returns a lang code for clear Arabic/Devanagari/English text, warna None (langid fallback).
+    """
+    counts = {"arabic": 0, "devanagari": 0, "latin": 0, "other": 0}
+    non_ascii_latin = False
+    for char in text:
+        if not char.isalpha():
+            continue
+        script = _script_of(char)
+        counts[script] += 1
+        if script == "latin" and ord(char) >= 0x80:
+            non_ascii_latin = True
+
+    total = sum(counts.values())
+    if total < MIN_SCRIPT_LETTERS:
+        return None
+
+    if counts["arabic"] / total >= SCRIPT_THRESHOLD:
+        return "ar"
+    if counts["devanagari"] / total >= SCRIPT_THRESHOLD:
+        return "hi"
+    if counts["latin"] / total >= SCRIPT_THRESHOLD and not non_ascii_latin:
+        # Plain ASCII is only "clear" English when it contains common English words;
+        # Spanish/French/romanized text still goes to langid.
+        words = {w.strip(".,!?;:'\"()").lower() for w in text.split()}
+        if words & ENGLISH_HINT_WORDS:
+            return "en"
+    return None
+
+
+# --- Memoized Detection ---
+DETECT_CACHE_SIZE = 4096
+_detect_cache = OrderedDict()
+_detect_cache_lock = threading.Lock()   # API server ke threads bhi yahi cache use karte hain
+
+
+def _text_key(text):
+    return hashlib.sha1(unicodedata.normalize("NFC", text).encode("utf-8")).hexdigest()
+
+
+# --- langid (lazy: import + model load sirf jab script path decide na kar sake) ---
+_langid = None
+_langid_lock = threading.Lock()
+
+
+def _get_langid():
+    global _langid
+    if _langid is None:
+        with _langid_lock:
+            if _langid is None:
+                import langid
+                # langid model pehli classify() par load karta hai, bina lock ke; yahan ek hi
+                # baar load karte hain warna parallel threads (API server) sab alag se load karte hain
+                langid.classify("warm up")
+                _langid = langid
+    return _langid
+
+
+def warm_up_language_model():
+    """langid model pehle se load kar deta hai (background prewarm ke liye)."""
+    _get_langid().classify("warm up")
+
+
+def _classify(text):
+    start = time.perf_counter()
+    lang_code = classify_by_script(text)
+    path = "script"
+    if lang_code is None:
+        lang_code, _ = _get_langid().classify(text)
+        path = "langid"
+    record("detect_language", time.perf_counter() - start, {"chars": len(text)}, path=path, lang=lang_code)
+    return lang_code
+
 
 def detect_language(text):
     """
-    Detects the user's language using langid.
+    Detects the user's language (script fast path, phir langid).
+    Result content hash par cache hota hai, so reruns don't pay for it again.
     Returns (lang_code, lang_name)
     """
     if not text or not text.strip():
         return "ar", "Arabic"  # Default to Arabic
 
+    key = _text_key(text)
+    with _detect_cache_lock:
+        cached = _detect_cache.get(key)
+        if cached is not None:
+            _detect_cache.move_to_end(key)
+            return cached
+
     try:
-        lang_code, _ = langid.classify(text)
-        lang_map = {
-            "ar": "Arabic",
-            "en": "English",
-            "hi": "Hindi",
-            "es": "Spanish",
-            "fr": "French",
-            "tr": "Turkish",
-            "de": "German",
-        }
-        lang_name = lang_map.get(lang_code, lang_code.capitalize())
-        return lang_code, lang_name
+        lang_code = _classify(text)
+        result = (lang_code, LANG_NAMES.get(lang_code, lang_code.capitalize()))
     except Exception:
         return "ar", "Arabic"
+
+    with _detect_cache_lock:
+        _detect_cache[key] = result
+        if len(_detect_cache) > DETECT_CACHE_SIZE:
+            _detect_cache.popitem(last=False)
+    return result
+
+
+# --- Batch API ---
+def detect_languages(texts):
+    """List of texts ke liye [(lang_code, lang_name), ...] return karta hai."""
+    return [detect_language(text) for text in texts]
+
+
+def annotate_messages(messages):
+    """
+    Har message dict par "lang" set karta hai agar pehle se na ho
+    (e.g. history loaded from rafiq_memory.db). Same list return karta hai.
+    """
+    for message in messages:
+        if not message.get("lang"):
+            message["lang"] = detect_language(message.get("content", ""))[0]
+    return messages
@@ -0,0 +1,331 @@
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import openai
+from openai import OpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from dotenv import load_dotenv
+
+# --- Settings ---
+load_dotenv()
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+# Local OpenAI-compatible stub server ke against test karne ke liye override
+LLM_BASE_URL = os.getenv("RAFIQ_LLM_BASE_URL", "https://openrouter.ai/api/v1")
+
+DEFAULT_MODEL = "openai/gpt-4o-mini"
+# Sidebar (app.py) wale models, fallback order
+FALLBACK_MODELS = [
+    "openai/gpt-4o-mini",
+    "openai/gpt-4o",
+    "mistralai/mistral-7b-instruct-v0.2",
+    "anthropic/claude-3.5-sonnet",
+]
+CONNECT_TIMEOUT = 5.0
+ATTEMPT_TIMEOUT = 30.0        # ek upstream call ki max duration
+DEFAULT_DEADLINE = 45.0       # poori call (retries + fallbacks) ki max duration
+MAX_RETRIES = 2               # per model
+BACKOFF_BASE = 0.4
+BACKOFF_CAP = 4.0
+# Latency do kinds mein alag track hoti hai, apne apne SLO ke saath (is se slow model fallback order mein
+# peeche jata hai): blocking call ka poora jawab ("total") aur stream ka pehla token ("ttft").
+# Ek hi window mein mix hote toh chhote TTFT samples slow blocking calls ko chhupa dete.
+LATENCY_SLO_P95 = 12.0        # "total"
+TTFT_SLO_P95 = 4.0            # "ttft"
+SLO_BY_KIND = {"total": LATENCY_SLO_P95, "ttft": TTFT_SLO_P95}
+MIN_SAMPLES_FOR_SLO = 5
+STATS_WINDOW = 100
+HEDGE_MIN_DELAY = 1.0
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMGatewayError(Exception):
+    """Saare retries / fallback models fail ho gaye."""
+
+
+# --- Rolling latency stats per (model, kind) ---
+class ModelStats:
+    def __init__(self, window=STATS_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.errors = deque(maxlen=window)   # 1 = failed attempt, 0 = success
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok=True):
+        with self._lock:
+            self.latencies.append(latency)
+            self.errors.append(0 if ok else 1)
+
+    def percentile(self, q):
+        with self._lock:
+            values = sorted(self.latencies)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def snapshot(self):
+        with self._lock:
+            errors = list(self.errors)
+        return {
+            "samples": len(errors),
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "error_rate": (sum(errors) / len(errors)) if errors else 0.0,
+        }
+
+
+def _close_stream_result(future):
+    """Haari hui hedged request ka stream (agar khul gaya) band karta hai."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    stream, _, _ = future.result()
+    try:
+        stream.close()
+    except Exception:
+        pass
+
+
+def _collect_stream(stream, first_chunk):
+    """Streamed chunks ko ek non-streaming ChatCompletion mein jodta hai."""
+    parts = []
+    usage = None
+    finish_reason = None
+    last = None
+    try:
+        for chunk in itertools.chain([first_chunk] if first_chunk is not None else [], stream):
+            last = chunk
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    finally:
+        stream.close()
+    return ChatCompletion(
+        id=last.id if last else "",
+        object="chat.completion",
+        created=last.created if last else int(time.time()),
+        model=last.model if last else "",
+        choices=[Choice(index=0, finish_reason=finish_reason or "stop",
+                        message=ChatCompletionMessage(role="assistant", content="".join(parts)))],
+        usage=usage,
+    )
+
+
+def _backoff(attempt):
+    # Full jitter: 0..min(cap, base * 2^attempt)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+# --- Gateway ---
+class LLMGateway:
+    """
+    Ek shared, pooled OpenAI-compatible client (keep-alive) with deadlines, jittered retries,
+    optional hedging aur latency-aware model fallback. core_logic aur image_processor dono yahi use karte hain.
+    """
+
+    def __init__(self, api_key, base_url=LLM_BASE_URL, fallback_models=None):
+        # Ek hi client = ek connection pool (keep-alive) poore process ke liye.
+        # Retries gateway khud karta hai, SDK ke andar nahi.
+        self.client = OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=openai.Timeout(ATTEMPT_TIMEOUT, connect=CONNECT_TIMEOUT),
+            max_retries=0,
+        )
+        self.fallback_models = list(fallback_models or FALLBACK_MODELS)
+        self.stats = {}               # (model, kind) -> ModelStats; kind "total" ya "ttft"
+        self.hedges = 0               # hedged calls jinmein doosri request bheji gayi
+        self._stats_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+    def model_stats(self, model, kind="total"):
+        with self._stats_lock:
+            key = (model, kind)
+            if key not in self.stats:
+                self.stats[key] = ModelStats()
+            return self.stats[key]
+
+    def breaches_slo(self, model):
+        """Kisi bhi kind ka p95 (kam se kam MIN_SAMPLES_FOR_SLO samples par) apne SLO se upar."""
+        for kind, slo in SLO_BY_KIND.items():
+            stats = self.model_stats(model, kind)
+            p95 = stats.percentile(0.95)
+            if len(stats.latencies) >= MIN_SAMPLES_FOR_SLO and p95 is not None and p95 > slo:
+                return True
+        return False
+
+    def _slowness(self, model):
+        """p50 apne SLO ke fraction mein (dono kinds mein jo zyada); bina samples ke 1.0."""
+        ratios = []
+        for kind, slo in SLO_BY_KIND.items():
+            p50 = self.model_stats(model, kind).percentile(0.50)
+            if p50 is not None:
+                ratios.append(p50 / slo)
+        return max(ratios) if ratios else 1.0
+
+    def candidate_models(self, model, fallback=True, fallback_models=None):
+        """Primary pehle, jab tak woh SLO breach na kare; baaki healthy models p50 ke hisaab se."""
+        model = model or DEFAULT_MODEL
+        if not fallback:
+            return [model]
+        others = [m for m in (fallback_models or self.fallback_models) if m != model]
+        others.sort(key=self._slowness)
+        healthy = [m for m in others if not self.breaches_slo(m)]
+        slow = [m for m in others if self.breaches_slo(m)]
+        if self.breaches_slo(model) and healthy:
+            return healthy + [model] + slow
+        return [model] + healthy + slow
+
+    def _attempt(self, model, messages, timeout, stream=False, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = self.client.with_options(timeout=timeout).chat.completions.create(
+                model=model, messages=messages, stream=stream, **kwargs
+            )
+        except Exception:
+            self.model_stats(model, "ttft" if stream else "total").record(time.perf_counter() - start, ok=False)
+            raise
+        if not stream:
+            self.model_stats(model).record(time.perf_counter() - start)
+        return result
+
+    def _open_first_chunk(self, model, messages, timeout, **kwargs):
+        """Stream kholta hai aur pehla chunk padh leta hai. Returns (stream, first_chunk, ttft)."""
+        start = time.perf_counter()
+        stream = self._attempt(model, messages, timeout, stream=True, **kwargs)
+        try:
+            return stream, next(iter(stream), None), time.perf_counter() - start
+        except BaseException:
+            stream.close()
+            raise
+
+    def _attempt_hedged(self, model, messages, timeout, **kwargs):
+        """
+        Primary request ka pehla token uske p95 (ya HEDGE_MIN_DELAY) tak na aaye toh doosri identical request;
+        jiska pehla token pehle aaye woh jeetti hai aur doosri ka stream band ho jata hai (upstream generation
+        wahin rukti hai). Isi liye dono requests streaming hain. Returns a ChatCompletion (text only).
+        Winner ka pehla token "ttft" stats mein, poori call "total" stats mein record hoti hai.
+        """
+        start = time.perf_counter()
+        kwargs = dict(kwargs, stream_options={"include_usage": True})
+        hedge_delay = max(HEDGE_MIN_DELAY, self.model_stats(model, "ttft").percentile(0.95) or 0.0)
+        futures = [self._hedge_pool.submit(self._open_first_chunk, model, messages, timeout, **kwargs)]
+        done, _ = wait(futures, timeout=min(hedge_delay, timeout))
+        if not done:
+            with self._stats_lock:
+                self.hedges += 1
+            futures.append(self._hedge_pool.submit(self._open_first_chunk, model, messages, timeout, **kwargs))
+
+        winner = None
+        last_error = None
+        pending = set(futures)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    last_error = future.exception()
+                elif winner is None:
+                    winner = future
+        for future in futures:
+            if future is not winner and not future.cancel():
+                future.add_done_callback(_close_stream_result)
+        if winner is None:
+            raise last_error
+
+        stream, first_chunk, ttft = winner.result()
+        self.model_stats(model, "ttft").record(ttft)
+        completion = _collect_stream(stream, first_chunk)
+        self.model_stats(model).record(time.perf_counter() - start)
+        return completion
+
+    def _call(self, messages, model=None, deadline=None, fallback=True, fallback_models=None,
+              stream=False, hedge=False, **kwargs):
+        deadline_at = time.monotonic() + (deadline or DEFAULT_DEADLINE)
+        last_error = None
+
+        for candidate in self.candidate_models(model, fallback, fallback_models):
+            for attempt in range(MAX_RETRIES + 1):
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise LLMGatewayError(f"Deadline exceeded (last error: {last_error})")
+                timeout = min(ATTEMPT_TIMEOUT, remaining)
+                try:
+                    if hedge and not stream:
+                        return candidate, self._attempt_hedged(candidate, messages, timeout, **kwargs)
+                    return candidate, self._attempt(candidate, messages, timeout, stream=stream, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    last_error = e
+                    if attempt < MAX_RETRIES:
+                        time.sleep(min(_backoff(attempt), max(0.0, deadline_at - time.monotonic())))
+                except openai.APIStatusError as e:
+                    # 4xx (bad request, auth) retry se theek nahi hote; model-specific 404 par agla model
+                    last_error = e
+                    if e.status_code in (401, 403):
+                        raise LLMGatewayError(str(e)) from e
+                    break
+            print(f"⚠️ Model {candidate} failed ({last_error}); trying fallback.")
+
+        raise LLMGatewayError(str(last_error))
+
+    def chat(self, messages, model=None, **kwargs):
+        """Non-streaming completion. Returns (model_used, completion)."""
+        return self._call(messages, model=model, stream=False, **kwargs)
+
+    def open_stream(self, messages, model=None, **kwargs):
+        """
+        Streaming completion. Retry/fallback sirf stream khulne tak (pehle token se pehle) hota hai.
+        Returns (model_used, stream); latency `record_stream_latency` se record hoti hai.
+        """
+        return self._call(messages, model=model, stream=True, **kwargs)
+
+    def record_stream_latency(self, model, ttft, ok=True):
+        """Streams ke liye time-to-first-token ("ttft" stats, TTFT_SLO_P95): total duration reply ki lambai batati hai."""
+        self.model_stats(model, "ttft").record(ttft, ok=ok)
+
+    def stats_snapshot(self):
+        """{model: {kind: snapshot}}"""
+        with self._stats_lock:
+            keys = list(self.stats)
+        snapshot = {}
+        for model, kind in keys:
+            snapshot.setdefault(model, {})[kind] = self.model_stats(model, kind).snapshot()
+        return snapshot
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+_missing_key_reported = False
+
+
+def get_gateway():
+    """Process-wide gateway; API key na ho toh None."""
+    global _gateway, _missing_key_reported
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                if not OPENROUTER_API_KEY:
+                    if not _missing_key_reported:
+                        print("❌ Error: OPENROUTER_API_KEY not found in .env file.")
+                        _missing_key_reported = True
+                    return None
+                try:
+                    _gateway = LLMGateway(OPENROUTER_API_KEY)
+                except Exception as e:
+                    print(f"⚠️ Error initializing LLM gateway: {e}")
+                    return None
+    return _gateway
@@ -1,85 +1,328 @@
 import sqlite3
 import json
 import os
+import threading
+import time
+
+from components.metrics import span
 
 # Database file ka path. Yeh file project ke root directory mein banegi.
 DB_PATH = 'rafiq_memory.db'
 
-def init_db():
-    """Database aur 'user_chats' table ko initialize karta hai, agar woh exist na karein toh."""
-    
-    # Ensure the components directory exists if DB_PATH was set relative to it.
-    # For simplicity, keeping it at project root as defined above.
-    
+# Connection tuning: WAL readers writers ko block nahi karte, NORMAL sync WAL ke saath safe hai.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA busy_timeout=5000",
+)
+
+_conn = None
+_conn_path = None
+_lock = threading.RLock()
+
+# Dusre components (e.g. retrieval index) ko naye/clear hue messages ki khabar dene ke liye
+_append_listeners = []
+_clear_listeners = []
+
+
+def add_append_listener(callback):
+    """callback(user_id, first_seq, messages) har successful append ke baad chalta hai."""
+    if callback not in _append_listeners:
+        _append_listeners.append(callback)
+
+
+def add_clear_listener(callback):
+    """callback(user_id, from_seq) clear_memory ke baad chalta hai (from_seq se aage ke messages hate)."""
+    if callback not in _clear_listeners:
+        _clear_listeners.append(callback)
+
+
+def _notify(listeners, *args):
+    for callback in listeners:
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"memory_handler listener error: {e}")
+
+
+def get_connection():
+    """
+    Process-wide reused connection return karta hai (pehli call par open + schema init).
+    Streamlit har rerun alag thread mein chalata hai, isliye check_same_thread=False + lock.
+    """
+    global _conn, _conn_path
+    with _lock:
+        if _conn is None or _conn_path != DB_PATH:
+            if _conn is not None:
+                _conn.close()
+            _conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+            for pragma in PRAGMAS:
+                _conn.execute(pragma)
+            _conn_path = DB_PATH
+            _create_schema(_conn)
+        return _conn
+
+
+def close_connection():
+    global _conn, _conn_path
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+        _conn = None
+        _conn_path = None
+
+
+def _create_schema(conn):
+    # Ek row per message; (user_id, seq) primary key hi tail/page loads ka index hai.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            lang TEXT,
+            timestamp REAL NOT NULL,
+            PRIMARY KEY (user_id, seq)
+        ) WITHOUT ROWID
+    ''')
+    # Rolling summary of older turns (context_builder), ek row per user
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS summaries (
+            user_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            covered INTEGER NOT NULL,
+            anchor TEXT,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    _migrate_legacy_blobs(conn)
+
+
+def _migrate_legacy_blobs(conn):
+    """Purani 'user_chats' table (poori history ek JSON blob mein) ko messages table mein move karta hai."""
+    legacy = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='user_chats'"
+    ).fetchone()
+    if not legacy:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Table create karna: user_id (unique identifier) aur chat_history (JSON string)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_chats (
-                user_id TEXT PRIMARY KEY,
-                chat_history TEXT
+        now = time.time()
+        for user_id, chat_history in conn.execute('SELECT user_id, chat_history FROM user_chats').fetchall():
+            try:
+                messages = json.loads(chat_history) if chat_history else []
+            except json.JSONDecodeError as e:
+                print(f"Skipping unreadable legacy history for {user_id}: {e}")
+                continue
+            if conn.execute('SELECT 1 FROM messages WHERE user_id = ? LIMIT 1', (user_id,)).fetchone():
+                continue
+            conn.executemany(
+                'INSERT INTO messages (user_id, seq, role, content, lang, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                [_row(user_id, seq, m, now) for seq, m in enumerate(messages)],
             )
-        ''')
-        conn.commit()
+        # Data delete nahi hota, sirf table rename - zaroorat ho toh wapas dekh sakte hain
+        conn.execute('ALTER TABLE user_chats RENAME TO user_chats_migrated')
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        conn.execute("ROLLBACK")
+        print(f"SQLite error during legacy migration: {e}")
+
+
+def _row(user_id, seq, message, default_ts=None):
+    return (
+        user_id,
+        seq,
+        message.get("role", "user"),
+        message.get("content", ""),
+        message.get("lang"),
+        message.get("timestamp") or default_ts or time.time(),
+    )
+
+
+def _to_message(row):
+    role, content, lang, timestamp = row
+    message = {"role": role, "content": content, "timestamp": timestamp}
+    if lang:
+        message["lang"] = lang
+    return message
+
+
+def init_db():
+    """Database aur 'messages' table ko initialize karta hai (aur legacy blobs migrate karta hai)."""
+    try:
+        get_connection()
     except sqlite3.Error as e:
         print(f"SQLite error during init_db: {e}")
-    finally:
-        if conn:
-            conn.close()
 
-def load_memory(user_id):
-    """Specific user_id ke liye pichli chat history database se load karta hai."""
-    conn = None
+
+def count_messages(user_id):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # User ID ke basis par history fetch karna
-        cursor.execute('SELECT chat_history FROM user_chats WHERE user_id = ?', (user_id,))
-        result = cursor.fetchone()
-        
-        if result:
-            # JSON string ko wapas Python list mein convert karna
-            return json.loads(result[0])
-        
-        # Agar koi history nahi mili
-        return None 
+        conn = get_connection()
+        with _lock:
+            row = conn.execute('SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0]
     except sqlite3.Error as e:
-        print(f"SQLite error during load_memory: {e}")
+        print(f"SQLite error during count_messages: {e}")
+        return None
+
+
+def append_messages(user_id, messages):
+    """Naye messages ko history ke end par append karta hai (O(new messages), poori history nahi). Returns next seq."""
+    try:
+        conn = get_connection()
+        with _lock, span("sqlite_save") as s:
+            s.set(messages=len(messages))
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                next_seq = conn.execute(
+                    'SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE user_id = ?', (user_id,)
+                ).fetchone()[0]
+                conn.executemany(
+                    'INSERT INTO messages (user_id, seq, role, content, lang, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                    [_row(user_id, next_seq + i, m) for i, m in enumerate(messages)],
+                )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        _notify(_append_listeners, user_id, next_seq, messages)
+        return next_seq + len(messages)
+    except sqlite3.Error as e:
+        print(f"SQLite error during append_messages: {e}")
         return None
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error during load_memory: {e}")
+
+
+def append_message(user_id, message):
+    return append_messages(user_id, [message])
+
+
+def load_memory(user_id, limit=None, before_seq=None):
+    """
+    Specific user_id ke liye chat history load karta hai (oldest first).
+    limit: sirf aakhri N messages (tail); before_seq: us seq se pehle wala page (older messages).
+    """
+    try:
+        conn = get_connection()
+        query = 'SELECT role, content, lang, timestamp FROM messages WHERE user_id = ?'
+        params = [user_id]
+        if before_seq is not None:
+            query += ' AND seq < ?'
+            params.append(before_seq)
+        if limit is not None:
+            query += ' ORDER BY seq DESC LIMIT ?'
+            params.append(limit)
+            with _lock:
+                rows = conn.execute(query, params).fetchall()
+            rows.reverse()
+        else:
+            query += ' ORDER BY seq'
+            with _lock:
+                rows = conn.execute(query, params).fetchall()
+
+        if not rows:
+            # Agar koi history nahi mili
+            return None
+        return [_to_message(row) for row in rows]
+    except sqlite3.Error as e:
+        print(f"SQLite error during load_memory: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
+
+
+def load_tail(user_id, n):
+    return load_memory(user_id, limit=n)
+
+
+def clear_memory(user_id, from_seq=0):
+    """User ki history delete karta hai; from_seq diya ho toh sirf us seq se aage ke messages."""
+    try:
+        conn = get_connection()
+        with _lock:
+            conn.execute('DELETE FROM messages WHERE user_id = ? AND seq >= ?', (user_id, from_seq))
+            # Jo summary hate hue messages ko cover karti thi woh ab is history ki nahi
+            conn.execute('DELETE FROM summaries WHERE user_id = ? AND covered > ?', (user_id, from_seq))
+    except sqlite3.Error as e:
+        print(f"SQLite error during clear_memory: {e}")
+        return
+    _notify(_clear_listeners, user_id, from_seq)
+
+
+def _same(row, message):
+    role, content = row
+    return role == message.get("role", "user") and content == message.get("content", "")
+
+
+def _matching_prefix(conn, user_id, messages):
+    """
+    DB aur list kahan tak same hain (role + content). Returns (matching count, stored count).
+    Normal turn par sirf aakhri stored row dekhi jaati hai (O(1)); woh list se match na kare
+    (chat clear, edit, list chhoti) tabhi poori history scan hoti hai.
+    """
+    last = conn.execute(
+        'SELECT seq, role, content FROM messages WHERE user_id = ? ORDER BY seq DESC LIMIT 1', (user_id,)
+    ).fetchone()
+    if last is None:
+        return 0, 0
+    stored = last[0] + 1
+    if stored <= len(messages) and _same(last[1:], messages[stored - 1]):
+        return stored, stored
+    rows = conn.execute(
+        'SELECT role, content FROM messages WHERE user_id = ? ORDER BY seq', (user_id,)
+    ).fetchall()
+    matching = 0
+    for row, message in zip(rows, messages):
+        if not _same(row, message):
+            break
+        matching += 1
+    return matching, len(rows)
+
 
 def save_memory(user_id, messages):
-    """Current chat history ko database mein save (ya update) karta hai."""
-    conn = None
+    """
+    Current chat history save karta hai. DB aur list jahan tak same hain woh rows nahi chhoti jaati;
+    jahan se content alag hai (ya list chhoti ho gayi, e.g. chat clear) wahan se history rewrite hoti hai.
+    Aakhri stored row list se match kare toh sirf naye messages append hote hain (beech ka edit tab
+    detect nahi hota - app history sirf end par badhti hai ya clear hoti hai).
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Messages list ko JSON string mein convert karna
-        history_json = json.dumps(messages)
-        
-        # Agar user_id exist karta hai toh update karo, nahi toh naya row insert karo
-        cursor.execute('''
-            INSERT OR REPLACE INTO user_chats (user_id, chat_history) 
-            VALUES (?, ?)
-        ''', (user_id, history_json))
-        
-        conn.commit()
+        conn = get_connection()
+        with _lock:
+            matching, stored = _matching_prefix(conn, user_id, messages)
+            if matching < stored:
+                clear_memory(user_id, from_seq=matching)
+            if len(messages) > matching:
+                append_messages(user_id, messages[matching:])
     except sqlite3.Error as e:
         print(f"SQLite error during save_memory: {e}")
-    finally:
-        if conn:
-            conn.close()
+
+def load_summary(user_id):
+    """Returns (summary, covered, anchor) ya None. covered = kitne shuru ke messages summary mein fold ho chuke hain."""
+    try:
+        conn = get_connection()
+        with _lock:
+            row = conn.execute(
+                'SELECT summary, covered, anchor FROM summaries WHERE user_id = ?', (user_id,)
+            ).fetchone()
+        return row
+    except sqlite3.Error as e:
+        print(f"SQLite error during load_summary: {e}")
+        return None
+
+
+def save_summary(user_id, summary, covered, anchor=None):
+    try:
+        conn = get_connection()
+        with _lock:
+            conn.execute('''
+                INSERT OR REPLACE INTO summaries (user_id, summary, covered, anchor, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, summary, covered, anchor, time.time()))
+    except sqlite3.Error as e:
+        print(f"SQLite error during save_summary: {e}")
 
 # Initial setup check ke liye
 if __name__ == '__main__':
     init_db()
-    print("Database initialized (rafiq_memory.db created if it didn't exist).")
\ No newline at end of file
+    print("Database initialized (rafiq_memory.db created if it didn't exist).")
@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Settings ---
+# RAFIQ_METRICS_JSONL=path -> har span ek JSON line; RAFIQ_METRICS_PORT=9108 -> Prometheus text endpoint
+METRICS_JSONL_PATH = os.getenv("RAFIQ_METRICS_JSONL")
+METRICS_PORT = os.getenv("RAFIQ_METRICS_PORT")
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 1000        # p50/p95 ke liye har series ke aakhri itne samples
+
+
+class Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        values = sorted(self.recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class MetricsRegistry:
+    """Process-wide histograms (stage + tags) aur counters (tokens, bytes)."""
+
+    def __init__(self, jsonl_path=METRICS_JSONL_PATH):
+        self.histograms = {}     # (stage, (("lang", "ar"), ("model", ...))) -> Histogram
+        self.counters = {}       # (name, stage, tags) -> total
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, tags=None, fields=None):
+        """Ek stage ki duration record karta hai. tags = labels (model, lang); fields = token counts / payload sizes."""
+        label_items = tuple(sorted((k, str(v)) for k, v in (tags or {}).items() if v is not None))
+        with self._lock:
+            key = (stage, label_items)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+            for name, value in (fields or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    counter_key = (name, stage, label_items)
+                    self.counters[counter_key] = self.counters.get(counter_key, 0) + value
+        if self.jsonl_path:
+            self._write_event(stage, seconds, tags, fields)
+
+    def _write_event(self, stage, seconds, tags, fields):
+        event = {"ts": time.time(), "stage": stage, "seconds": round(seconds, 6)}
+        event.update({k: v for k, v in (tags or {}).items() if v is not None})
+        event.update(fields or {})
+        try:
+            with self._lock, open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Metrics JSONL write error: {e}")
+
+    def summary(self):
+        """Har stage ke liye (saare tags mila kar) count, p50, p95 - sidebar panel ke liye."""
+        merged = {}
+        with self._lock:
+            for (stage, _), hist in self.histograms.items():
+                merged.setdefault(stage, []).extend(hist.recent)
+        rows = []
+        for stage in sorted(merged):
+            values = sorted(merged[stage])
+            rows.append({
+                "stage": stage,
+                "count": len(values),
+                "p50_ms": values[int(0.50 * len(values))] * 1000,
+                "p95_ms": values[min(len(values) - 1, int(0.95 * len(values)))] * 1000,
+            })
+        return rows
+
+    def render_prometheus(self):
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP rafiq_stage_seconds Latency of each Rafiq pipeline stage.",
+            "# TYPE rafiq_stage_seconds histogram",
+        ]
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+
+        def labels(items, extra=()):
+            pairs = [("stage", items[0])] + list(items[1]) + list(extra)
+            return ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+
+        for (stage, label_items), hist in histograms:
+            base = (stage, label_items)
+            for bound, count in zip(BUCKETS, hist.bucket_counts):
+                lines.append(f"rafiq_stage_seconds_bucket{{{labels(base, [('le', bound)])}}} {count}")
+            lines.append(f"rafiq_stage_seconds_bucket{{{labels(base, [('le', '+Inf')])}}} {hist.count}")
+            lines.append(f"rafiq_stage_seconds_sum{{{labels(base)}}} {hist.total}")
+            lines.append(f"rafiq_stage_seconds_count{{{labels(base)}}} {hist.count}")
+
+        names = sorted({name for (name, _, _), _ in counters})
+        for name in names:
+            lines.append(f"# TYPE rafiq_{name}_total counter")
+            for (counter_name, stage, label_items), value in counters:
+                if counter_name == name:
+                    lines.append(f"rafiq_{name}_total{{{labels((stage, label_items))}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Span:
+    def __init__(self, stage, tags):
+        self.stage = stage
+        self.tags = tags
+        self.fields = {}
+
+    def set(self, **fields):
+        """Token counts / payload sizes jaisi values span par attach karta hai."""
+        self.fields.update(fields)
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+
+@contextmanager
+def span(stage, **tags):
+    """
+    with span("llm", model=model, lang=lang) as s:
+        ...
+        s.set(prompt_tokens=..., completion_tokens=...)
+    """
+    current = Span(stage, dict(tags))
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.tags["status"] = "error"
+        raise
+    finally:
+        REGISTRY.record(stage, time.perf_counter() - start, current.tags, current.fields)
+
+
+def record(stage, seconds, fields=None, **tags):
+    """Pehle se measure ki hui duration (e.g. time-to-first-token) record karta hai."""
+    REGISTRY.record(stage, seconds, tags, fields)
+
+
+# --- Prometheus text endpoint ---
+_server = None
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    """Background thread mein /metrics serve karta hai (ek process mein ek hi baar)."""
+    global _server
+    if _server is not None:
+        return _server
+    port = int(port or METRICS_PORT or 0)
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = REGISTRY.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        _server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"Metrics server could not start on port {port}: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="rafiq-metrics", daemon=True).start()
+    return _server
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import pytesseract
+
+from components.metrics import span
+
+# --- Pipeline settings ---
+OCR_LANG = 'ara+eng'
+MAX_OCR_WIDTH = 1600          # phone screenshots (~4000px) is se zyada width par sirf slow hote hain
+MIN_OCR_WIDTH = 800           # chhoti images upscale hoti hain taaki text ~30px ho
+STRIP_ASPECT = 2.5            # height/width is se zyada ho toh image strips mein tootti hai
+STRIP_OVERLAP = 40            # strips ke beech overlap (px) taaki line cut na ho
+MAX_DESKEW_ANGLE = 15.0
+OCR_CACHE_SIZE = 128
+OCR_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+_ocr_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# --- 1. Decode (in-memory, koi temp file nahi) ---
+def read_image_bytes(image_file):
+    """bytes, file path ya file-like (Streamlit UploadedFile) se raw bytes nikalta hai."""
+    if isinstance(image_file, (bytes, bytearray, memoryview)):
+        return bytes(image_file)
+    if isinstance(image_file, (str, os.PathLike)):
+        with open(image_file, 'rb') as f:
+            return f.read()
+    if hasattr(image_file, 'getvalue'):
+        return image_file.getvalue()
+    return image_file.read()
+
+
+def decode_grayscale(data):
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError("Could not decode image data.")
+    return image
+
+
+# --- 2. Preprocess: resize -> binarize -> deskew ---
+def adaptive_resize(gray):
+    height, width = gray.shape[:2]
+    if width > MAX_OCR_WIDTH:
+        scale = MAX_OCR_WIDTH / width
+        return cv2.resize(gray, (MAX_OCR_WIDTH, int(height * scale)), interpolation=cv2.INTER_AREA)
+    if width < MIN_OCR_WIDTH:
+        scale = MIN_OCR_WIDTH / width
+        return cv2.resize(gray, (MIN_OCR_WIDTH, int(height * scale)), interpolation=cv2.INTER_CUBIC)
+    return gray
+
+
+def binarize(gray):
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Dark mode screenshots: text safed ho toh invert, Tesseract dark-on-light chahta hai
+    if np.mean(binary) < 127:
+        binary = cv2.bitwise_not(binary)
+    return binary
+
+
+def deskew(binary):
+    coords = cv2.findNonZero(cv2.bitwise_not(binary))
+    if coords is None or len(coords) < 50:
+        return binary
+    angle = cv2.minAreaRect(coords)[-1]
+    # OpenCV versions alag range dete hain; angle ko (-45, 45] mein laana
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if abs(angle) < 0.5 or abs(angle) > MAX_DESKEW_ANGLE:
+        return binary
+    height, width = binary.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(binary, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def preprocess(data):
+    return deskew(binarize(adaptive_resize(decode_grayscale(data))))
+
+
+def split_strips(image):
+    """Lambi (tall) image ko ~width*STRIP_ASPECT height ki overlapping strips mein todta hai."""
+    height, width = image.shape[:2]
+    strip_height = int(width * STRIP_ASPECT)
+    if height <= strip_height:
+        return [image]
+    strips = []
+    top = 0
+    while top < height:
+        bottom = min(height, top + strip_height)
+        strips.append(image[max(0, top - STRIP_OVERLAP):bottom])
+        top = bottom
+    return strips
+
+
+# --- 3. OCR (strips parallel in a process pool) ---
+def _ocr_array(image):
+    return pytesseract.image_to_string(image, lang=OCR_LANG).strip()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    return _pool
+
+
+def ocr_image_bytes(data, use_cache=True, parallel=True):
+    """
+    Image bytes par poora pipeline chalata hai aur extracted text return karta hai.
+    Result image ke SHA-256 par cache hota hai. parallel=False: strips isi process mein ek-ek karke
+    (jab caller khud process pool worker ho, e.g. API server).
+    """
+    key = hashlib.sha256(data).hexdigest()
+    if use_cache:
+        with _cache_lock:
+            cached = _ocr_cache.get(key)
+            if cached is not None:
+                _ocr_cache.move_to_end(key)
+                return cached
+
+    with span("ocr_preprocess") as s:
+        strips = split_strips(preprocess(data))
+        s.set(input_bytes=len(data))
+    with span("ocr", strips=len(strips)) as s:
+        if len(strips) == 1:
+            text = _ocr_array(strips[0])
+        else:
+            parts = list(_get_pool().map(_ocr_array, strips)) if parallel else [_ocr_array(strip) for strip in strips]
+            text = "\n".join(part for part in parts if part)
+        s.set(chars=len(text))
+
+    with _cache_lock:
+        _ocr_cache[key] = text
+        if len(_ocr_cache) > OCR_CACHE_SIZE:
+            _ocr_cache.popitem(last=False)
+    return text
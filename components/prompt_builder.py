@@ -0,0 +1,121 @@
+import json
+import os
+from functools import lru_cache
+
+from components.context_builder import truncate_to_tokens
+
+# --- Prompt layout (provider prompt caching ke liye) ---
+# [static prefix: persona + rules + profile + duas]  <- har call par byte-for-byte same
+# [rolling summary]                                   <- sirf history segment jump par badalta hai
+# [history segment, append-only]                      <- har turn sirf end mein judta hai
+# [latest user message + <context> note]              <- volatile: language hint, retrieved references
+# Provider (OpenAI automatic, Anthropic cache_control) pichle call ka longest common prefix cache karta hai.
+
+CREATOR = "Mohammad"
+DUAS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'arabic_duas.txt')
+STATIC_REFERENCE_TOKENS = 1500      # duas corpus ka itna hissa prefix mein
+CACHE_CONTROL_PREFIXES = ("anthropic/",)   # inhe explicit cache breakpoints chahiye
+
+PERSONA_AND_RULES = (
+    "You are **Rafiq (رفيق)** — a friendly and emotionally intelligent AI assistant created by {creator} "
+    "for {user}. You must always reply **in the same language** as the user's latest message; "
+    "its detected language is given in the <context> note at the end of that message.\n\n"
+    "✨ Rules:\n"
+    "- Reply strictly in the user's input language.\n"
+    "- Never translate or mix languages.\n"
+    "- Be warm, natural, and human-like.\n"
+    "- Keep responses short, meaningful, and emotionally engaging.\n"
+    "- If user greets or chats casually, respond like a close supportive friend.\n"
+    "- If user asks questions, answer with helpful clarity.\n"
+    "- The <context> note is added by the app, not written by the user; never quote or mention it.\n"
+)
+
+
+def _render_value(value):
+    if isinstance(value, dict):
+        return "; ".join(f"{k}: {_render_value(v)}" for k, v in value.items())
+    if isinstance(value, list):
+        return ", ".join(_render_value(v) for v in value)
+    return str(value)
+
+
+def render_profile(profile):
+    """Profile JSON ko stable bullet list mein (file order, koi timestamp/random nahi)."""
+    lines = []
+    for key, value in profile.items():
+        if key == "contact":
+            continue   # phone/email model ko bhejne ki zaroorat nahi
+        lines.append(f"- {key.replace('_', ' ').capitalize()}: {_render_value(value)}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1)
+def load_static_references():
+    """Duas corpus (data/arabic_duas.txt) ka shuru ka hissa, token cap ke andar."""
+    try:
+        with open(DUAS_PATH, encoding='utf-8') as f:
+            text = f.read().strip()
+    except OSError:
+        return ""
+    return truncate_to_tokens(text, STATIC_REFERENCE_TOKENS) if text else ""
+
+
+@lru_cache(maxsize=8)
+def _static_prefix(profile_json):
+    profile = json.loads(profile_json)
+    user = profile.get("name", "Ghadeer")
+    prefix = PERSONA_AND_RULES.format(creator=CREATOR, user=user)
+    if profile:
+        prefix += f"\n👤 About {user}:\n{render_profile(profile)}\n"
+    references = load_static_references()
+    if references:
+        prefix += f"\n📖 Duas and reminders you may draw on:\n{references}\n"
+    return prefix
+
+
+def static_prefix(profile):
+    """Persona + rules + profile + reference material. Same profile => same bytes (cached)."""
+    return _static_prefix(json.dumps(profile or {}, ensure_ascii=False))
+
+
+def volatile_context(language_name, references=None):
+    """Har turn badalne wali cheezein: detected language + retrieved snippets."""
+    note = f"<context>\nDetected language of this message: {language_name}.\n"
+    if references:
+        note += "📚 Possibly relevant references (use only if they fit):\n"
+        note += "".join(f"- {ref}\n" for ref in references)
+    return note + "</context>"
+
+
+def attach_volatile_context(messages, note):
+    """Note ko aakhri user message ke end mein jodta hai (naya list; stored history nahi badalti)."""
+    if not note:
+        return messages
+    messages = list(messages)
+    if messages and messages[-1]["role"] == "user":
+        last = messages[-1]
+        messages[-1] = dict(last, content=f"{last['content']}\n\n{note}")
+    else:
+        messages.append({"role": "system", "content": note})
+    return messages
+
+
+def apply_cache_breakpoints(messages, model):
+    """
+    Anthropic models sirf explicit cache_control tak cache karte hain: static prefix ke end par
+    aur stable history ke end (latest user message se pehle) par breakpoint lagata hai.
+    Baaki models ke liye messages jaise hain waise (OpenAI prefix caching automatic hai).
+    """
+    if not model or not model.startswith(CACHE_CONTROL_PREFIXES):
+        return messages
+    marked = list(messages)
+    breakpoints = {0}
+    if len(marked) >= 3:
+        breakpoints.add(len(marked) - 2)
+    for index in breakpoints:
+        message = marked[index]
+        if isinstance(message["content"], str):
+            marked[index] = dict(message, content=[{
+                "type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"},
+            }])
+    return marked
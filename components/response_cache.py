@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from components import memory_handler
+
+# --- Settings (opt-in) ---
+RESPONSE_CACHE_ENABLED = os.getenv("RAFIQ_RESPONSE_CACHE", "0") == "1"
+CACHE_DB_NAME = 'rafiq_cache.db'
+CACHE_TTL_SECONDS = 24 * 3600
+CACHE_MAX_ENTRIES = 5000        # SQLite tier
+FRONT_MAX_ENTRIES = 256         # in-process tier
+
+
+def cache_key(model, messages, temperature):
+    """(model, system prompt + trimmed history, temperature) ka canonical SHA-256."""
+    canonical = {
+        "model": model,
+        "temperature": round(float(temperature), 3),
+        "messages": [
+            {"role": m["role"], "content": " ".join(str(m["content"]).split())}
+            for m in messages
+        ],
+    }
+    payload = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Do-tier exact-match cache: in-process LRU ke peeche SQLite (TTL + LRU eviction)."""
+
+    def __init__(self, db_path=None, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES,
+                 front_entries=FRONT_MAX_ENTRIES):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(memory_handler.DB_PATH) or '.', CACHE_DB_NAME)
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.front_entries = front_entries
+        self._front = OrderedDict()    # key -> (response, latency, expires_at)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                latency REAL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_access ON response_cache(last_access)')
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.latency_saved = 0.0
+
+    def _front_put(self, key, entry):
+        self._front[key] = entry
+        self._front.move_to_end(key)
+        if len(self._front) > self.front_entries:
+            self._front.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._front.get(key)
+            if entry is not None and entry[2] <= now:
+                del self._front[key]
+                entry = None
+            if entry is None:
+                try:
+                    row = self._conn.execute(
+                        'SELECT response, latency, created_at FROM response_cache WHERE key = ?', (key,)
+                    ).fetchone()
+                    if row and row[2] + self.ttl > now:
+                        self._conn.execute('UPDATE response_cache SET last_access = ? WHERE key = ?', (now, key))
+                        entry = (row[0], row[1] or 0.0, row[2] + self.ttl)
+                        self._front_put(key, entry)
+                    elif row:
+                        self._conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                except sqlite3.Error as e:
+                    print(f"SQLite error during response cache get: {e}")
+            else:
+                self._front.move_to_end(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.latency_saved += entry[1]
+            return entry[0]
+
+    def put(self, key, response, model=None, latency=None):
+        now = time.time()
+        with self._lock:
+            self._front_put(key, (response, latency or 0.0, now + self.ttl))
+            try:
+                self._conn.execute('''
+                    INSERT OR REPLACE INTO response_cache (key, model, response, latency, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (key, model, response, latency, now, now))
+                self.stores += 1
+                if self.stores % 50 == 0:
+                    self.evict()
+            except sqlite3.Error as e:
+                print(f"SQLite error during response cache put: {e}")
+
+    def evict(self):
+        """Expired rows hatata hai, phir least-recently-used rows jab tak max_entries na ho."""
+        with self._lock:
+            self._conn.execute('DELETE FROM response_cache WHERE created_at < ?', (time.time() - self.ttl,))
+            self._conn.execute('''
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_s": self.latency_saved,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def cache_enabled(use_cache=None):
+    """Per-request override (True/False); None = global RAFIQ_RESPONSE_CACHE setting."""
+    return RESPONSE_CACHE_ENABLED if use_cache is None else bool(use_cache)
@@ -0,0 +1,296 @@
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from collections import Counter
+
+from components import memory_handler
+
+# --- Settings ---
+DUAS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'arabic_duas.txt')
+BM25_K1 = 1.5
+BM25_B = 0.75
+SNIPPET_CHARS = 300
+SNAPSHOT_EVERY = 200          # har itne naye docs ke baad index snapshot disk par
+COMMON_TERM_RATIO = 0.25      # itne docs mein aane wale terms stopword jaise hain - skip
+MAX_POSTINGS_SCAN = 1500      # lambi postings list ke sirf top-impact docs score hote hain
+DEFAULT_TIME_BUDGET_MS = 5.0
+
+
+# --- Arabic normalization + light stemming ---
+_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+_TOKEN = re.compile(r'\w+')
+_AR_PREFIXES = ('وبال', 'وال', 'بال', 'كال', 'فال', 'لل', 'ال', 'و')
+_AR_SUFFIXES = ('هما', 'كما', 'ها', 'ان', 'ات', 'ون', 'ين', 'يه', 'كم', 'هم', 'نا', 'ه', 'ي')
+_EN_SUFFIXES = ('ing', 'ed', 'es', 's')
+
+
+def normalize_text(text):
+    """Tashkeel/tatweel hatata hai, alef/ya/ta-marbuta fold karta hai, Latin lowercase."""
+    return _DIACRITICS.sub('', text).translate(_FOLD).lower()
+
+
+def _is_arabic(token):
+    return '\u0600' <= token[0] <= '\u06FF'
+
+
+def light_stem(token):
+    if _is_arabic(token):
+        for prefix in _AR_PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+                token = token[len(prefix):]
+                break
+        for suffix in _AR_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                break
+        return token
+    for suffix in _EN_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    return [light_stem(t) for t in _TOKEN.findall(normalize_text(text)) if len(t) > 1]
+
+
+# --- BM25 inverted index ---
+class BM25Index:
+    def __init__(self):
+        self.postings = {}      # term -> {doc_id: tf}
+        self.doc_len = {}       # doc_id -> token count
+        self.docs = {}          # doc_id -> (owner, snippet)
+        self.total_len = 0
+        self.watermarks = {}    # user_id -> next message seq already indexed
+        self._impact_lists = {}  # (term, owner) -> (postings size when sorted, top visible postings by tf/len)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add_document(self, doc_id, text, owner=None):
+        terms = tokenize(text)
+        if not terms:
+            return False
+        with self._lock:
+            if doc_id in self.doc_len:
+                return False
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            self.doc_len[doc_id] = len(terms)
+            self.total_len += len(terms)
+            self.docs[doc_id] = (owner, text[:SNIPPET_CHARS])
+        return True
+
+    def remove_owner(self, owner, from_seq=0):
+        """Ek user ke docs hata deta hai (chat clear par); from_seq ho toh sirf us seq se aage ke messages."""
+        with self._lock:
+            doc_ids = [d for d, (doc_owner, _) in self.docs.items()
+                       if doc_owner == owner and int(d.rsplit(":", 1)[1]) >= from_seq]
+            for doc_id in doc_ids:
+                self.docs.pop(doc_id)
+                self.total_len -= self.doc_len.pop(doc_id)
+            removed = set(doc_ids)
+            for term in list(self.postings):
+                postings = self.postings[term]
+                for doc_id in removed.intersection(postings):
+                    del postings[doc_id]
+                if not postings:
+                    del self.postings[term]
+            if from_seq:
+                self.watermarks[owner] = min(self.watermarks.get(owner, 0), from_seq)
+            else:
+                self.watermarks.pop(owner, None)
+            self._impact_lists.clear()
+
+    def _visible(self, postings, owner):
+        docs = self.docs
+        return [(doc_id, tf) for doc_id, tf in postings.items() if docs[doc_id][0] in (None, owner)]
+
+    def _scan_list(self, term, postings, owner):
+        """
+        Sirf global + `owner` ke docs (dusre users ke docs scoring mein aate hi nahi). Chhoti list poori;
+        lambi list ke liye (term, owner) ki cached impact-sorted top MAX_POSTINGS_SCAN (10% growth par refresh).
+        """
+        if len(postings) <= MAX_POSTINGS_SCAN:
+            return self._visible(postings, owner)
+        cached = self._impact_lists.get((term, owner))
+        if cached is None or len(postings) > cached[0] * 1.1:
+            doc_len = self.doc_len
+            top = heapq.nlargest(MAX_POSTINGS_SCAN, self._visible(postings, owner),
+                                 key=lambda item: item[1] / doc_len[item[0]])
+            cached = (len(postings), top)
+            self._impact_lists[(term, owner)] = cached
+        return cached[1]
+
+    def search(self, query, k=3, owner=None, time_budget_ms=DEFAULT_TIME_BUDGET_MS):
+        """
+        Top-k (score, doc_id, snippet). Sirf global docs (owner None) aur `owner` ke apne docs match hote hain.
+        Rare (high-idf) terms pehle score hote hain; time budget khatam ho toh baaki terms skip.
+        """
+        deadline = time.perf_counter() + time_budget_ms / 1000.0
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if not n_docs:
+                return []
+            avgdl = self.total_len / n_docs
+
+            terms = []
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if postings:
+                    df = len(postings)
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    terms.append((idf, term, postings))
+            terms.sort(reverse=True)
+            if len(terms) > 1:
+                common = [t for t in terms if len(t[2]) > n_docs * COMMON_TERM_RATIO]
+                if len(common) < len(terms):
+                    terms = [t for t in terms if len(t[2]) <= n_docs * COMMON_TERM_RATIO]
+
+            scores = {}
+            doc_len = self.doc_len
+            for i, (idf, term, postings) in enumerate(terms):
+                if i and time.perf_counter() > deadline:
+                    break
+                for doc_id, tf in self._scan_list(term, postings, owner):
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[doc_id] / avgdl)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            return [(score, doc_id, self.docs[doc_id][1])
+                    for score, doc_id in heapq.nlargest(k, ((s, d) for d, s in scores.items()))]
+
+    # --- Persistence (snapshot file next to rafiq_memory.db) ---
+    def save(self, path):
+        with self._lock:
+            state = (self.postings, self.doc_len, self.docs, self.total_len, self.watermarks)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        try:
+            with open(path, 'rb') as f:
+                (index.postings, index.doc_len, index.docs,
+                 index.total_len, index.watermarks) = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Retrieval index snapshot unreadable, rebuilding: {e}")
+            return cls()
+        return index
+
+
+# --- Process-wide index over duas + saved conversations ---
+_index = None
+_index_lock = threading.Lock()
+_unsaved = 0
+
+
+def snapshot_path():
+    return f"{memory_handler.DB_PATH}.index"
+
+
+def _index_duas(index):
+    try:
+        with open(DUAS_PATH, 'r', encoding='utf-8') as f:
+            paragraphs = [p.strip() for p in f.read().split('\n\n')]
+    except FileNotFoundError:
+        return
+    for number, paragraph in enumerate(paragraphs):
+        if paragraph:
+            index.add_document(f"dua:{number}", paragraph)
+
+
+def _catch_up_messages(index):
+    """Snapshot ke baad save hue messages (watermark se aage) index karta hai."""
+    conn = memory_handler.get_connection()
+    with memory_handler._lock:
+        users = conn.execute('SELECT user_id, MAX(seq) FROM messages GROUP BY user_id').fetchall()
+    added = 0
+    for user_id, max_seq in users:
+        start = index.watermarks.get(user_id, 0)
+        if max_seq < start:
+            continue
+        with memory_handler._lock:
+            rows = conn.execute(
+                'SELECT seq, content FROM messages WHERE user_id = ? AND seq >= ? ORDER BY seq',
+                (user_id, start),
+            ).fetchall()
+        for seq, content in rows:
+            added += index.add_document(f"msg:{user_id}:{seq}", content, owner=user_id)
+        index.watermarks[user_id] = max_seq + 1
+    return added
+
+
+def _on_messages_appended(user_id, first_seq, messages):
+    global _unsaved
+    index = _index
+    if index is None:
+        return
+    for offset, message in enumerate(messages):
+        _unsaved += index.add_document(f"msg:{user_id}:{first_seq + offset}", message.get("content", ""), owner=user_id)
+    index.watermarks[user_id] = first_seq + len(messages)
+    if _unsaved >= SNAPSHOT_EVERY:
+        save_index()
+
+
+def _on_messages_cleared(user_id, from_seq=0):
+    if _index is not None:
+        _index.remove_owner(user_id, from_seq)
+        save_index()
+
+
+def get_index():
+    """Pehli call par snapshot load (ya build) karta hai, phir naye saved messages incrementally add hote hain."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = BM25Index.load(snapshot_path())
+                _index_duas(index)
+                try:
+                    added = _catch_up_messages(index)
+                except Exception as e:
+                    print(f"Retrieval catch-up error: {e}")
+                    added = 0
+                _index = index
+                memory_handler.add_append_listener(_on_messages_appended)
+                memory_handler.add_clear_listener(_on_messages_cleared)
+                if added:
+                    save_index()
+    return _index
+
+
+def save_index():
+    global _unsaved
+    if _index is None:
+        return
+    try:
+        _index.save(snapshot_path())
+        _unsaved = 0
+    except OSError as e:
+        print(f"Retrieval index save error: {e}")
+
+
+def retrieve_snippets(query, user_id=None, k=3, exclude_texts=(), time_budget_ms=DEFAULT_TIME_BUDGET_MS):
+    """Prompt mein daalne ke liye top-k relevant snippets (duas + user ki purani baatein)."""
+    if not query or not query.strip():
+        return []
+    try:
+        results = get_index().search(query, k=k + min(len(exclude_texts), 10), owner=user_id, time_budget_ms=time_budget_ms)
+    except Exception as e:
+        print(f"Retrieval error: {e}")
+        return []
+    excluded = {text[:SNIPPET_CHARS] for text in exclude_texts}
+    return [snippet for _, _, snippet in results if snippet not in excluded][:k]
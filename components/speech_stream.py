@@ -0,0 +1,422 @@
+import io
+import json
+import os
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from components.metrics import span
+
+# --- Audio settings (pipeline ke andar sab kuch 16 kHz mono int16 PCM hai) ---
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_MS = 30
+CHUNK_MS = 100                   # WAV fixtures / mic se itne ms ke chunks aate hain
+
+# --- VAD settings ---
+VAD_MARGIN_DB = 12.0             # noise floor se itna upar = speech
+VAD_MIN_LEVEL_DB = -50.0         # is se neeche kabhi speech nahi (digital silence)
+VAD_START_MS = 90                # itni lagataar speech ke baad utterance shuru
+VAD_END_SILENCE_MS = 600         # itni khamoshi ke baad utterance khatam
+VAD_PRE_ROLL_MS = 240            # start se pehle ka audio bhi segment mein (pehla syllable na kate)
+MIN_SEGMENT_MS = 300             # is se chhote segments (clicks, coughs) drop
+MAX_SEGMENT_S = 20.0             # lambi baat beech mein kaat kar transcribe hoti hai
+PARTIAL_INTERVAL_MS = 1000       # bolte waqt har itne ms par partial transcript
+
+# --- Engine settings ---
+# whisper (default, faster-whisper requirements.txt mein hai): pehli transcription par model Hugging Face se
+# download hota hai ("small" ~460 MB, ~/.cache/huggingface mein) - uske baad poori tarah offline.
+# Bina network wali machine par RAFIQ_STT_MODEL ko pehle se downloaded model directory par set karein.
+# vosk / sphinx optional hain (vosk, pocketsphinx alag se install karne padte hain).
+STT_ENGINE = os.getenv("RAFIQ_STT_ENGINE", "whisper")     # whisper | vosk | sphinx
+STT_MODEL = os.getenv("RAFIQ_STT_MODEL", "small")         # whisper size ya model directory, ya vosk model directory
+
+
+# --- 1. Audio input (WAV fixtures, recorded bytes, live microphone) ---
+def to_pcm16_mono(samples, sample_rate, channels=1):
+    """numpy samples (int ya float) ko 16 kHz mono int16 PCM bytes mein badalta hai."""
+    samples = np.asarray(samples)
+    if samples.dtype.kind == "f":
+        samples = np.clip(samples, -1.0, 1.0) * 32767
+    samples = samples.astype(np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if sample_rate != SAMPLE_RATE and len(samples):
+        duration = len(samples) / sample_rate
+        target = np.linspace(0, duration, int(duration * SAMPLE_RATE), endpoint=False)
+        samples = np.interp(target, np.arange(len(samples)) / sample_rate, samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+
+def read_wav(source):
+    """WAV file path, bytes ya file-like (st.audio_input) -> 16 kHz mono PCM bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(bytes(source))
+    elif hasattr(source, "getvalue"):
+        source = io.BytesIO(source.getvalue())
+    with wave.open(source, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) * 256
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2")
+    elif width == 4:
+        samples = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bit")
+    return to_pcm16_mono(samples, rate, channels)
+
+
+def write_wav(pcm, path_or_file, sample_rate=SAMPLE_RATE):
+    with wave.open(path_or_file, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+
+
+def wav_chunks(source, chunk_ms=CHUNK_MS, realtime=False):
+    """WAV ko chunks mein deta hai jaise mic deta; realtime=True par utna hi sleep bhi karta hai."""
+    pcm = read_wav(source)
+    step = SAMPLE_RATE * SAMPLE_WIDTH * chunk_ms // 1000
+    for offset in range(0, len(pcm), step):
+        if realtime:
+            time.sleep(chunk_ms / 1000)
+        yield pcm[offset:offset + step]
+
+
+def microphone_chunks(chunk_ms=CHUNK_MS, device_index=None, stop_event=None):
+    """Live mic audio (speech_recognition + PyAudio) ko 16 kHz chunks mein deta hai, stop_event set hone tak."""
+    import speech_recognition as sr  # lazy: PyAudio sirf desktop/local mic ke liye chahiye
+
+    frames = SAMPLE_RATE * chunk_ms // 1000
+    with sr.Microphone(device_index=device_index, sample_rate=SAMPLE_RATE, chunk_size=frames) as mic:
+        while stop_event is None or not stop_event.is_set():
+            raw = mic.stream.read(mic.CHUNK)
+            yield to_pcm16_mono(np.frombuffer(raw, dtype="<i2"), mic.SAMPLE_RATE)
+
+
+# --- 2. Energy-based voice activity detection ---
+def frame_level_db(frame):
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+    if not len(samples):
+        return -120.0
+    rms = np.sqrt(np.mean(samples * samples))
+    return 20 * np.log10(max(rms, 1.0) / 32768)
+
+
+class EnergyVAD:
+    """
+    Frame RMS (dBFS) ko ek adaptive noise floor se compare karta hai.
+    Floor khamoshi mein dheere upar aata hai aur shant frames par turant neeche.
+    """
+
+    def __init__(self, margin_db=VAD_MARGIN_DB, min_level_db=VAD_MIN_LEVEL_DB, initial_floor_db=-60.0):
+        self.margin_db = margin_db
+        self.min_level_db = min_level_db
+        self.noise_floor_db = initial_floor_db
+
+    def is_speech(self, frame):
+        level = frame_level_db(frame)
+        speech = level > max(self.noise_floor_db + self.margin_db, self.min_level_db)
+        if level < self.noise_floor_db:
+            self.noise_floor_db = level
+        elif not speech:
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * level
+        return speech
+
+
+class Segment:
+    def __init__(self, index, start, pcm):
+        self.index = index
+        self.start = start          # seconds, stream ke shuru se
+        self.pcm = bytearray(pcm)
+        self.end = None
+
+    @property
+    def duration(self):
+        return len(self.pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+
+class UtteranceSegmenter:
+    """Chunks -> frames -> VAD state machine. feed() naye/khatam segments ke events deta hai."""
+
+    def __init__(self, vad=None, frame_ms=FRAME_MS, start_ms=VAD_START_MS, end_silence_ms=VAD_END_SILENCE_MS,
+                 pre_roll_ms=VAD_PRE_ROLL_MS, min_segment_ms=MIN_SEGMENT_MS, max_segment_s=MAX_SEGMENT_S):
+        self.vad = vad or EnergyVAD()
+        self.frame_bytes = SAMPLE_RATE * SAMPLE_WIDTH * frame_ms // 1000
+        self.frame_s = frame_ms / 1000
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_silence_ms // frame_ms)
+        self.pre_roll_frames = pre_roll_ms // frame_ms
+        self.min_segment_s = min_segment_ms / 1000
+        self.max_segment_s = max_segment_s
+        self._buffer = bytearray()
+        self._recent = []           # pre-roll: aakhri kuch frames (speech shuru hone se pehle)
+        self._speech_run = 0
+        self._silence_run = 0
+        self._frames_seen = 0
+        self._next_index = 0
+        self.current = None
+
+    def feed(self, pcm):
+        """Returns [("segment", Segment)] un utterances ke liye jo is chunk mein khatam huin."""
+        self._buffer.extend(pcm)
+        finished = []
+        while len(self._buffer) >= self.frame_bytes:
+            frame = bytes(self._buffer[:self.frame_bytes])
+            del self._buffer[:self.frame_bytes]
+            segment = self._process_frame(frame)
+            if segment is not None:
+                finished.append(segment)
+        return finished
+
+    def flush(self):
+        """Stream khatam: adhoora utterance bhi close karta hai."""
+        if self._buffer:
+            self.feed(bytes(self._buffer) + bytes(self.frame_bytes - len(self._buffer)))
+        return [segment for segment in [self._close()] if segment is not None]
+
+    def _process_frame(self, frame):
+        now = self._frames_seen * self.frame_s
+        self._frames_seen += 1
+        speech = self.vad.is_speech(frame)
+
+        if self.current is None:
+            self._recent.append(frame)
+            if len(self._recent) > self.pre_roll_frames + self.start_frames:
+                self._recent.pop(0)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self.start_frames:
+                start = now + self.frame_s - len(self._recent) * self.frame_s
+                self.current = Segment(self._next_index, max(0.0, start), b"".join(self._recent))
+                self._next_index += 1
+                self._recent = []
+                self._silence_run = 0
+            return None
+
+        self.current.pcm.extend(frame)
+        self._silence_run = 0 if speech else self._silence_run + 1
+        if self._silence_run >= self.end_frames or self.current.duration >= self.max_segment_s:
+            return self._close()
+        return None
+
+    def _close(self):
+        segment, self.current = self.current, None
+        self._speech_run = 0
+        if segment is None:
+            return None
+        if self._silence_run:
+            # Peeche ki khamoshi engine ko bhejne ka fayda nahi, thoda sa hangover rakhte hain
+            trailing = max(0, self._silence_run - self.pre_roll_frames) * self.frame_bytes
+            if trailing:
+                del segment.pcm[-trailing:]
+        self._silence_run = 0
+        segment.end = segment.start + segment.duration
+        if segment.duration < self.min_segment_s:
+            return None
+        return segment
+
+
+# --- 3. Offline STT backends ---
+# Interface: transcribe(pcm, sample_rate, language) -> text. pcm = mono int16 bytes.
+class WhisperEngine:
+    """faster-whisper (CTranslate2), CPU par int8. Arabic/English/Hindi sab ek model mein."""
+
+    name = "whisper"
+
+    def __init__(self, model_size=STT_MODEL, device="cpu", compute_type="int8"):
+        from faster_whisper import WhisperModel  # lazy: model load bhaari hai
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+
+    def transcribe(self, pcm, sample_rate, language=None):
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+        segments, _ = self.model.transcribe(audio, language=language, beam_size=1,
+                                            vad_filter=False, condition_on_previous_text=False)
+        return " ".join(s.text.strip() for s in segments).strip()
+
+
+class VoskEngine:
+    """Vosk (Kaldi); ek model directory = ek language (e.g. vosk-model-ar-0.22)."""
+
+    name = "vosk"
+
+    def __init__(self, model_path=STT_MODEL):
+        import vosk  # lazy
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def transcribe(self, pcm, sample_rate, language=None):
+        recognizer = self._vosk.KaldiRecognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+class SphinxEngine:
+    """CMU PocketSphinx via speech_recognition (already a dependency); sirf installed language packs."""
+
+    name = "sphinx"
+    LANGUAGE_CODES = {"en": "en-US", "fr": "fr-FR", "es": "es-ES", "de": "de-DE"}
+
+    def __init__(self):
+        import speech_recognition as sr  # lazy
+        self._sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm, sample_rate, language=None):
+        audio = self._sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+        try:
+            return self.recognizer.recognize_sphinx(audio, language=self.LANGUAGE_CODES.get(language, "en-US"))
+        except self._sr.UnknownValueError:
+            return ""
+
+
+ENGINES = {"whisper": WhisperEngine, "vosk": VoskEngine, "sphinx": SphinxEngine}
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_stt_engine():
+    """Process-wide STT engine (RAFIQ_STT_ENGINE se; pehli call par load hota hai)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if STT_ENGINE not in ENGINES:
+                    raise ValueError(f"Unknown RAFIQ_STT_ENGINE '{STT_ENGINE}' (choose from {', '.join(ENGINES)})")
+                try:
+                    _engine = ENGINES[STT_ENGINE]()
+                except ImportError as e:
+                    raise ImportError(f"STT engine '{STT_ENGINE}' is not installed ({e}). "
+                                      "Run pip install -r requirements.txt or set RAFIQ_STT_ENGINE.") from e
+    return _engine
+
+
+def set_stt_engine(engine):
+    """STT backend swap karta hai (e.g. offline stub engine for tests/benchmarks)."""
+    global _engine
+    _engine = engine
+
+
+# --- 4. Streaming transcriber ---
+class StreamingTranscriber:
+    """
+    Audio chunks leta hai, VAD se utterances kaat-ta hai aur har utterance ko background worker
+    par transcribe karta hai jab tak user bol raha hai. Events (dicts):
+        {"type": "partial", "segment": i, "text": ...}
+        {"type": "final", "segment": i, "text": ..., "start", "end", "audio_s", "transcribe_s", "rtf"}
+    Finals hamesha segment order mein aate hain.
+    """
+
+    def __init__(self, engine=None, language=None, segmenter=None, partial_interval_ms=PARTIAL_INTERVAL_MS,
+                 workers=1):
+        self.engine = engine or get_stt_engine()
+        self.language = language
+        self.segmenter = segmenter or UtteranceSegmenter()
+        self.partial_interval_s = partial_interval_ms / 1000 if partial_interval_ms else None
+        self.finals = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt")
+        self._final_futures = {}        # segment index -> Future
+        self._partial_future = None     # (segment index, Future); ek waqt mein ek hi partial
+        self._last_partial_at = 0.0     # current segment ki kitni seconds par pichla partial bana
+        self._next_final = 0
+
+    def _run(self, kind, index, pcm):
+        audio_s = len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+        engine_name = getattr(self.engine, "name", type(self.engine).__name__)
+        with span("stt", engine=engine_name, kind=kind, lang=self.language) as s:
+            start = time.perf_counter()
+            text = self.engine.transcribe(bytes(pcm), SAMPLE_RATE, self.language)
+            elapsed = time.perf_counter() - start
+            s.set(audio_ms=int(audio_s * 1000))
+        return {"type": kind, "segment": index, "text": (text or "").strip(), "audio_s": audio_s,
+                "transcribe_s": elapsed, "rtf": elapsed / audio_s if audio_s else None}
+
+    def _submit_segment(self, segment):
+        future = self._executor.submit(self._run, "final", segment.index, segment.pcm)
+        self._final_futures[segment.index] = (segment, future)
+        self._last_partial_at = 0.0
+
+    def _maybe_submit_partial(self):
+        current = self.segmenter.current
+        if current is None or self.partial_interval_s is None:
+            return
+        if self._partial_future is not None and not self._partial_future[1].done():
+            return   # engine abhi pichla partial kar raha hai; queue nahi banani
+        if current.duration - self._last_partial_at < self.partial_interval_s:
+            return
+        self._last_partial_at = current.duration
+        self._partial_future = (current.index, self._executor.submit(self._run, "partial", current.index,
+                                                                     bytes(current.pcm)))
+
+    def _collect(self, wait=False):
+        events = []
+        if self._partial_future is not None and self._partial_future[1].done():
+            index, future = self._partial_future
+            self._partial_future = None
+            if index >= self._next_final:   # final aa chuka ho toh purana partial bekaar hai
+                event = self._result(future)
+                if event is not None:
+                    events.append(event)
+        while self._next_final in self._final_futures:
+            segment, future = self._final_futures[self._next_final]
+            if not wait and not future.done():
+                break
+            del self._final_futures[self._next_final]
+            self._next_final += 1
+            event = self._result(future)
+            if event is None:
+                continue
+            event.update(start=segment.start, end=segment.end)
+            self.finals.append(event)
+            events.append(event)
+        return events
+
+    def _result(self, future):
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"STT error: {e}")
+            return None
+
+    def feed(self, pcm):
+        """Ek audio chunk (16 kHz mono int16). Abhi tak tayyar events return karta hai (non-blocking)."""
+        for segment in self.segmenter.feed(pcm):
+            self._submit_segment(segment)
+        self._maybe_submit_partial()
+        return self._collect()
+
+    def finish(self):
+        """Stream band: aakhri utterance transcribe karke baaki saare finals return karta hai."""
+        for segment in self.segmenter.flush():
+            self._submit_segment(segment)
+        if self._partial_future is not None:
+            self._partial_future[1].cancel()
+            self._partial_future = None
+        events = self._collect(wait=True)
+        self._executor.shutdown(wait=False)
+        return events
+
+    def transcribe_stream(self, chunks):
+        """Generator: har chunk ke baad jo events tayyar hain woh yield, aakhir mein baaki finals."""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.finish()
+
+    @property
+    def transcript(self):
+        return " ".join(event["text"] for event in self.finals if event["text"])
+
+
+def transcribe_wav(source, engine=None, language=None, chunk_ms=CHUNK_MS):
+    """WAV fixture ka poora transcript + per-segment stats (RTF) - tests/benchmarks ke liye."""
+    transcriber = StreamingTranscriber(engine=engine, language=language)
+    events = list(transcriber.transcribe_stream(wav_chunks(source, chunk_ms)))
+    return transcriber.transcript, [event for event in events if event["type"] == "final"]
@@ -0,0 +1,259 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from components.audio_cache import audio_key, get_audio_cache
+from components.lang_handler import LANG_NAMES, classify_by_script, detect_language
+from components.metrics import span
+
+# --- Pipeline settings ---
+# gTTS khud text ko 100-char requests mein todta hai aur unhe ek ke baad ek bhejta hai;
+# hum usi size ke chunks bana kar unhe parallel bhejte hain (ek chunk = ek Google request)
+MAX_CHUNK_CHARS = 100
+TTS_WORKERS = 4               # Google TTS par ek saath itni requests, zyada par throttling hoti hai
+LANGID_MIN_LETTERS = 20       # is se chhote ambiguous chunks reply ki language lete hain
+
+# Sentence ends: Latin + Arabic question mark (؟) + Urdu full stop (۔); decimals ("3.5") nahi tootte
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?؟۔…])\s+|\s*\n+\s*')
+# Clause breaks: Arabic comma (،) / semicolon (؛) + Latin ones, sirf lambe sentences ke liye
+_CLAUSE_SPLIT = re.compile(r'(?<=[،؛,;:])\s+')
+_MARKDOWN_LINK = re.compile(r'\[([^\]]+)\]\([^)]*\)')
+_MARKDOWN_BULLET = re.compile(r'^\s*(?:[-•]|\d+[.)])\s+', re.MULTILINE)
+_MARKDOWN_MARKS = re.compile(r'[*_`#>|~]+')
+
+
+# --- 1. Segmenter ---
+def clean_for_speech(text):
+    """Markdown (bold, bullets, links, code ticks) hata deta hai taaki TTS unhe bole nahi."""
+    text = _MARKDOWN_LINK.sub(r'\1', text)
+    text = _MARKDOWN_BULLET.sub('', text)
+    return _MARKDOWN_MARKS.sub('', text)
+
+
+def _pack(parts, max_chars):
+    """Chhote parts ko order mein jodta hai jab tak max_chars ke andar rahein."""
+    packed = []
+    for part in parts:
+        if packed and len(packed[-1]) + 1 + len(part) <= max_chars:
+            packed[-1] = f"{packed[-1]} {part}"
+        else:
+            packed.append(part)
+    return packed
+
+
+def _split_long(sentence, max_chars):
+    if len(sentence) <= max_chars:
+        return [sentence]
+    parts = []
+    for clause in _CLAUSE_SPLIT.split(sentence):
+        # Clause bhi lamba ho toh words par (gTTS bhi yahi karta hai)
+        parts.extend([clause] if len(clause) <= max_chars else _pack(clause.split(), max_chars))
+    return _pack(parts, max_chars)
+
+
+def _piece_language(piece):
+    code = classify_by_script(piece)
+    if code is None and sum(char.isalpha() for char in piece) >= LANGID_MIN_LETTERS:
+        code = detect_language(piece)[0]
+    return code if code in LANG_NAMES else None
+
+
+def _has_speech(chunk):
+    return any(char.isalnum() for char in chunk)
+
+
+def split_for_speech(text, language="ar", max_chars=MAX_CHUNK_CHARS):
+    """
+    Reply ko sentence/clause chunks mein todta hai, har chunk ki apni language ke saath.
+    Same-language padosi chunks max_chars tak jud jaate hain. Returns [(chunk_text, lang_code), ...]
+    """
+    chunks = []
+    for sentence in _SENTENCE_SPLIT.split(clean_for_speech(text)):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for piece in _split_long(sentence, max_chars):
+            lang = _piece_language(piece)
+            if chunks:
+                previous, previous_lang = chunks[-1]
+                same_voice = lang is None or previous_lang is None or lang == previous_lang
+                if same_voice and len(previous) + 1 + len(piece) <= max_chars:
+                    chunks[-1] = (f"{previous} {piece}", previous_lang or lang)
+                    continue
+            chunks.append((piece, lang))
+    return [(chunk, lang or language) for chunk, lang in chunks if _has_speech(chunk)]
+
+
+# --- 2. MP3 frames (gapless joining, bina re-encode) ---
+_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+_VBR_TAGS = (b"Xing", b"Info", b"VBRI")
+
+
+def _frame_info(data, pos):
+    """MPEG Layer III frame header parse karta hai. Returns (length, sample_rate, samples) ya None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x3
+    layer = (data[pos + 1] >> 1) & 0x3
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = (_BITRATES_V1 if mpeg1 else _BITRATES_V2)[bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (data[pos + 2] >> 1) & 0x1
+    length = (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+    return length, sample_rate, 1152 if mpeg1 else 576
+
+
+def _skip_id3v2(data, pos):
+    if data[pos:pos + 3] != b"ID3" or len(data) < pos + 10:
+        return pos
+    size = 0
+    for byte in data[pos + 6:pos + 10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[pos + 5] & 0x10 else 0
+    return pos + 10 + size + footer
+
+
+def mp3_frames(data):
+    """
+    Audio frames ki list [(start, end, sample_rate, samples)] - ID3 tags, Xing/Info header frame
+    aur beech ka junk chhod kar. Yahi frames jodne par segments ke beech koi container header nahi aata.
+    """
+    frames = []
+    pos = _skip_id3v2(data, 0)
+    while pos < len(data):
+        info = _frame_info(data, pos)
+        if info is None:
+            if data[pos:pos + 3] == b"ID3":
+                pos = _skip_id3v2(data, pos)
+            else:
+                pos += 1   # resync: agle frame header tak scan
+            continue
+        length, sample_rate, samples = info
+        if pos + length > len(data):
+            break          # adhoora aakhri frame
+        if not frames and any(tag in data[pos + 4:pos + 48] for tag in _VBR_TAGS):
+            pos += length  # VBR header frame: silent hota hai, join ke beech gap banata
+            continue
+        frames.append((pos, pos + length, sample_rate, samples))
+        pos += length
+    return frames
+
+
+def concat_mp3(segments):
+    """MP3 segments ko frame level par jodta hai (no re-encode). Unparseable segment jaisa hai waisa."""
+    if len(segments) == 1:
+        return segments[0]
+    out = bytearray()
+    for data in segments:
+        frames = mp3_frames(data)
+        if not frames:
+            out += data
+            continue
+        for start, end, _, _ in frames:
+            out += data[start:end]
+    return bytes(out)
+
+
+def mp3_duration(data):
+    """Frames se audio ki lambai (seconds)."""
+    return sum(samples / sample_rate for _, _, sample_rate, samples in mp3_frames(data))
+
+
+# --- 3. Parallel chunk synthesis ---
+class SpeechPipeline:
+    def __init__(self, cache=None, workers=TTS_WORKERS):
+        self._cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-chunk")
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-presynth")
+        self._inflight = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return self._cache or get_audio_cache()
+
+    def lookup(self, text, language="ar", slow=False):
+        """Poore reply ka cached audio (pichla play ya pre-synthesis), warna None."""
+        return self.cache.lookup(audio_key(text, language, slow))
+
+    def store(self, text, language, slow, data):
+        self.cache.store(audio_key(text, language, slow), data)
+
+    def _submit_chunk(self, chunk, language, slow):
+        # Same chunk pehle se ban raha ho (e.g. background pre-synthesis) toh wahi future
+        key = audio_key(chunk, language, slow)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self.cache.get_audio, chunk, language, slow)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _, key=key: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def submit(self, text, language="ar", slow=False):
+        """Saare chunks ek saath pool mein daalta hai. Returns [(chunk_text, lang_code, future), ...] in order."""
+        chunks = split_for_speech(text, language)
+        if not chunks:
+            raise ValueError("No text to speak.")
+        return [(chunk, lang, self._submit_chunk(chunk, lang, slow)) for chunk, lang in chunks]
+
+    def synthesize(self, text, language="ar", slow=False):
+        """Poore reply ka gapless MP3 (chunks parallel mein), cache mein bhi save."""
+        data = self.lookup(text, language, slow)
+        if data is not None:
+            return data
+        with span("tts_pipeline", lang=language) as s:
+            parts = [future.result() for _, _, future in self.submit(text, language, slow)]
+            data = concat_mp3(parts)
+            s.set(chars=len(text), chunks=len(parts), audio_bytes=len(data))
+        self.store(text, language, slow, data)
+        return data
+
+    def presynthesize(self, text, language="ar", slow=False):
+        """Background mein poora reply bana deta hai taaki 'Play' instant ho. Returns a Future (or None if cached)."""
+        if self.lookup(text, language, slow) is not None:
+            return None
+        key = audio_key(text, language, slow)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = self._background.submit(self._presynthesize_job, key, text, language, slow)
+            self._pending[key] = future
+        return future
+
+    def _presynthesize_job(self, key, text, language, slow):
+        try:
+            return self.synthesize(text, language, slow)
+        except Exception as e:
+            print(f"Background TTS error: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_tts_pipeline():
+    """Process-wide SpeechPipeline (shared AudioCache ke upar)."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = SpeechPipeline()
+    return _pipeline
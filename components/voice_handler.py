@@ -1,38 +1,104 @@
 import streamlit as st
-from gtts import gTTS
 import io
-import speech_recognition as sr
 import os
+import time
+from concurrent.futures import wait
+from components.metrics import record
+from components.tts_pipeline import concat_mp3, get_tts_pipeline, mp3_duration
 
 ## --- 1. Text-to-Speech (TTS) Function ---
-def play_audio_button(text, language="ar", unique_key=None):
+# Lambe replies chunks mein parallel bante hain (components/tts_pipeline.py); pehla chunk ready hote hi
+# bajna shuru, baaki ready hisse current clip khatam hone par agli clip ban kar chalte hain
+CLIP_SWITCH_MARGIN_S = 0.15   # current clip khatam hone se itna pehle agli clip ki taiyari
+POLL_INTERVAL_S = 0.05
+
+
+def _play_clip(player, parts):
+    """Ready MP3 parts ko ek gapless clip bana kar placeholder mein autoplay karta hai. Returns clip end time."""
+    clip = concat_mp3(parts)
+    player.audio(io.BytesIO(clip), format='audio/mp3', autoplay=True)
+    return time.monotonic() + mp3_duration(clip)
+
+
+def _play_progressive(text, language, slow):
+    pipeline = get_tts_pipeline()
+    cached = pipeline.lookup(text, language, slow)
+    if cached is not None:
+        st.audio(io.BytesIO(cached), format='audio/mp3', autoplay=True)
+        return
+
+    start = time.perf_counter()
+    chunks = pipeline.submit(text, language, slow)
+    player = st.empty()
+    played = 0          # kitne chunks player ko de diye
+    clip_end = 0.0
+    while played < len(chunks):
+        ready = played
+        while ready < len(chunks) and chunks[ready][2].done():
+            ready += 1
+        now = time.monotonic()
+        if ready > played and now >= clip_end - CLIP_SWITCH_MARGIN_S:
+            parts = [future.result() for _, _, future in chunks[played:ready]]
+            if clip_end > now:
+                time.sleep(clip_end - now)   # current clip ko beech mein na kaatein
+            if played == 0:
+                record("tts_first_audio", time.perf_counter() - start, {"chunks": len(chunks)}, lang=language)
+            clip_end = _play_clip(player, parts)
+            played = ready
+        elif ready < len(chunks):
+            wait([chunks[ready][2]], timeout=max(POLL_INTERVAL_S, clip_end - now - CLIP_SWITCH_MARGIN_S))
+        else:
+            time.sleep(max(0.0, min(POLL_INTERVAL_S, clip_end - now - CLIP_SWITCH_MARGIN_S)))
+
+    # Agli baar Play (ya rerun) par poora reply ek hi instant cached clip
+    pipeline.store(text, language, slow, concat_mp3([future.result() for _, _, future in chunks]))
+
+
+# Fragment: Play click sirf is button ko rerun karta hai, poori chat history ko nahi
+@st.fragment
+def play_audio_button(text, language="ar", unique_key=None, slow=False):
     """
     Generate karta hai audio aur use ek chote 'Play' button ke saath display karta hai.
+    Har chunk apni language mein parallel banta hai; playback pehle chunk se hi shuru ho jata hai.
+    Poora audio (text, language, speed) par cache hota hai, so repeat plays skip synthesis.
     """
     # Unique key zaroori hai Streamlit mein jab multiple buttons hon
     if st.button("🔊 Play", key=f"play_{unique_key}", help="Click to listen to this message"):
         try:
-            # 1. gTTS object create karna
-            tts = gTTS(text=text, lang=language, slow=False)
-            
-            # 2. Audio data ko memory mein save karna
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)
-            fp.seek(0)
-            
-            # 3. Streamlit audio player mein display karna (Hidden audio player)
-            # Autoplay=True jab button click hoga.
-            st.audio(fp, format='audio/mp3', autoplay=True)
-            
-            # Message ke neeche ek chota sa indicator
-            # st.caption("Playing...") 
-            
+            _play_progressive(text, language, slow)
         except Exception as e:
             st.error(f"Error playing audio: {e}")
 
-## --- 2. Speech-to-Text (STT) Placeholder ---
-# (Record and Recognize function jaisa tha, waisa hi rahega)
-def record_and_recognize():
-    r = sr.Recognizer()
-    # ... (baaki code same)
-    return r
\ No newline at end of file
+
+def presynthesize_audio(text, language="ar", slow=False):
+    """Naye assistant reply ka audio background mein (chunks parallel) bana deta hai."""
+    try:
+        return get_tts_pipeline().presynthesize(text, language=language, slow=slow)
+    except Exception as e:
+        print(f"Pre-synthesis error: {e}")
+        return None
+
+## --- 2. Speech-to-Text (STT) ---
+# Offline streaming pipeline (components/speech_stream.py): VAD se utterances, har ek background mein transcribe
+def record_and_recognize(audio, language=None, placeholder=None):
+    """
+    Recorded audio (st.audio_input ka WAV, bytes ya path) ko chunk-by-chunk transcriber mein daalta hai.
+    Partial transcript placeholder mein dikhta rehta hai. Returns (text, segments) - segments mein per-utterance RTF.
+    """
+    from components.speech_stream import StreamingTranscriber, wav_chunks  # lazy: STT model sirf voice par load
+
+    try:
+        transcriber = StreamingTranscriber(language=language)
+        finals = []
+        for event in transcriber.transcribe_stream(wav_chunks(audio)):
+            if event["type"] == "final":
+                finals.append(event)
+            if placeholder is not None:
+                live = transcriber.transcript
+                if event["type"] == "partial":
+                    live = f"{live} {event['text']}".strip()
+                placeholder.markdown(f"🎙️ _{live}…_")
+        return transcriber.transcript, finals
+    except Exception as e:
+        st.error(f"Error recognizing speech: {e}")
+        return "", []